@@ -17,21 +17,76 @@
 API_URL = "https://bestat.statbel.fgov.be/bestat/api"  
 VALID_EXPORTERS = ['XML','JSON','CSV','XLS','HTML','PDF']
 VALID_LANGUAGES = ['fr','en','nl','de']
+MAX_WORKERS = 8  # Number of parallel downloads
+MANIFEST_FILENAME = 'manifest.json'  # Incremental sync state, stored in Output
+SHARDS_FOLDER = 'shards'  # State of the shards of a sharded export until they are merged, stored in Output
+SHARD_STATE_FILENAME = 'shard.json'  # Counters and failed files of a finished shard, in its folder
+HISTORY_FILENAME = 'history.json'  # Size, duration and failures of every file in previous runs, stored in Output
+STATE_LOCK_TIMEOUT = 30  # Seconds. A lock of the manifest/history older than this was left by a crashed run
+PLAN_SKIP_FAILURES = 2  # Runs in a row a view/format must fail (HTTP error) before the planner skips it
+PLAN_RETRY_FAILED_AFTER = 7 * 24 * 3600  # Seconds. Skipped view/formats are tried again after this delay
+PLAN_DEFAULT_SECONDS = 1.0  # Estimated duration of a file when there is no history at all
+CATALOGUE_CACHE_FILENAME = 'catalogue.json.gz'  # Cached /datasources and /views, stored in Output
+CATALOGUE_CACHE_TTL = 24 * 3600  # Seconds before the cached catalogue is fetched again
+SNAPSHOTS_FOLDER = 'snapshots'  # Catalogue snapshots, one per change of the catalogue, stored in Output
+SNAPSHOTS_KEEP = 30  # Latest snapshots kept. 0 : no snapshot nor changelog
+CHANGELOG_FILENAME = 'changelog.ndjson'  # Changes of the catalogue between snapshots, one json line per change, stored in Output
+EXPORTED_SNAPSHOT_FILENAME = 'exported.json'  # Snapshot of the last --changed-only export of each filter, stored in Output/snapshots
+REPORTS_FOLDER = 'reports'  # Run reports (timings per request), stored in Output
+METADATA_FOLDER = 'metadata'  # Machine readable metadata (NDJSON, CSV, SQLite), stored in Output
+METADATA_FORMATS = ['txt', 'ndjson', 'csv', 'sqlite']  # txt : metadata.txt and linked_views.txt, as in the first versions
+COLUMNAR_FOLDER = 'columnar'  # Typed columnar copies of the CSV/JSON exports, stored in Output
+COLUMNAR_FORMAT = 'parquet'  # 'parquet' (compressed, smallest) or 'arrow' (Arrow IPC, zero-copy memory-mapped reads)
+MAX_CONNECTIONS_PER_HOST = 8  # Max simultaneous connections to one host (bestat.statbel.fgov.be)
+DOWNLOAD_CHUNK_SIZE = 64 * 1024  # Bytes read/written at a time : memory use doesn't depend on the file size
+DOWNLOAD_TIMEOUT = 30  # Seconds without data before a download is considered stalled
+DOWNLOAD_RETRIES = 3  # Attempts per file. Interrupted downloads resume where they stopped
+HTTP_RETRIES = 5  # Attempts per request on connection errors, timeouts, 429 and 5xx
+HTTP_BACKOFF = 1  # Seconds. Retries wait a random time up to HTTP_BACKOFF * 2**attempt (or Retry-After)
+HTTP_BACKOFF_MAX = 60  # Seconds. Max wait between two attempts
+HTTP_RATE_LIMIT = None  # Max requests per second sent to the API. None : no limit
+EXPORT_BACKEND = 'threads'  # 'threads' (requests, MAX_WORKERS threads) or 'async' (aiohttp, ASYNC_CONCURRENCY requests from one thread)
+ASYNC_CONCURRENCY = 256  # Max simultaneous requests of the async backend
+SEARCH_DEBOUNCE = 150  # Milliseconds without typing before the views list of the GUI is filtered
+PARTIAL_SUFFIX = '.part'  # Downloads in progress. Renamed to the final filename once complete
+BLOBS_FOLDER = 'blobs'  # Content-addressed store of the exported files (deduplication), stored in Output
+BLOBS_PRUNE_GRACE = 3600  # Seconds. Unlinked blobs and temp files younger than this may belong to a running export : not pruned
+DEDUP_SPOOL_SIZE = 8 * 1024 * 1024  # Bytes. Smaller files are hashed in memory : duplicates are never written to disk
+COMPRESSION = None  # Exported files compressed while downloading : None, 'gzip' (.gz) or 'zstd' (.zst, needs zstandard)
+COMPRESSION_LEVEL = None  # None : default level of the codec (gzip 6, zstd 3)
+COMPRESSIBLE_EXPORTERS = ['CSV', 'JSON', 'XML', 'HTML']  # Text formats. XLS and PDF are already compressed, saved as is
+COMPRESSION_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
 
 # ===============================================================
 # Imports
 # ===============================================================
+# requests, asyncio, sqlite3 and multiprocessing are imported by the functions that use them,
+# so the GUI and `--help` start without loading them
 from datetime import datetime
-import requests
-import logging
-import urllib.request
 import logging
 import sys
 import os
 import time
-from requests.exceptions import ConnectionError, Timeout
-from tkinter import  ttk,messagebox
-import tkinter as tk
+import re
+import argparse
+import json
+import gzip
+import zlib
+import hashlib
+import random
+import threading
+import queue
+import heapq
+import bisect
+import unicodedata
+import math
+import csv
+import io
+import glob
+import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+from email.utils import parsedate_to_datetime
 # ===============================================================
 # Functions
 # ===============================================================
@@ -63,30 +118,406 @@ def sanitize_filename(filename):
         sanitized_filename = sanitized_filename.replace(char, '_')    
     return sanitized_filename
 
-def fetch_data_with_retry(url, retries=5, delay=3):
+# ===============================================================
+# HTTP : one pooled session for the catalogue and the exports
+# ===============================================================
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class RateLimiter:
+    """
+    Token bucket shared by all threads : at most `rate` requests per second, on average.
+
+    Args:
+        rate (float): Requests per second. None or 0 : no limit.
+        burst (int, optional): Requests that can be sent at once after an idle period.
+    """
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Takes a token.
+
+        Returns:
+            float: Seconds to wait before sending the request.
+        """
+        if not self.rate:
+            return 0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            wait = (1 - self._tokens) / self.rate if self._tokens < 1 else 0
+            self._tokens -= 1
+        return wait
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+
+http_session = None
+http_session_lock = threading.Lock()
+rate_limiter = RateLimiter(HTTP_RATE_LIMIT)
+max_connections_per_host = MAX_CONNECTIONS_PER_HOST  # See set_max_connections_per_host
+
+def get_http_session():
+    """
+    Returns the shared requests.Session. Connections are kept alive and reused by all
+    threads, so files don't pay a new TCP/TLS handshake each.
+    """
+    global http_session
+    with http_session_lock:
+        if http_session is None:
+            import requests
+            http_session = requests.Session()
+            configure_http_pool(http_session, max(MAX_WORKERS, max_connections_per_host))
+        return http_session
+
+# --- Connection timings : time spent opening connections (DNS, TCP and TLS), per thread
+connection_timings = threading.local()
+
+timed_adapter_class = None
+
+def get_timed_adapter_class():
+    """
+    Returns TimedHTTPAdapter : an HTTPAdapter whose connections record their connect time in
+    `connection_timings`. Defined on first use, so requests and urllib3 are only imported when needed.
+    """
+    global timed_adapter_class
+    if timed_adapter_class is not None:
+        return timed_adapter_class
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+    class TimedHTTPConnection(HTTPConnection):
+        def connect(self):
+            start = time.perf_counter()
+            try:
+                super().connect()
+            finally:
+                connection_timings.connect = getattr(connection_timings, 'connect', 0.0) + time.perf_counter() - start
+
+    class TimedHTTPSConnection(HTTPSConnection):
+        def connect(self):
+            start = time.perf_counter()
+            try:
+                super().connect()
+            finally:
+                connection_timings.connect = getattr(connection_timings, 'connect', 0.0) + time.perf_counter() - start
+
+    class TimedHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = TimedHTTPConnection
+
+    class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = TimedHTTPSConnection
+
+    class TimedHTTPAdapter(HTTPAdapter):
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = {'http': TimedHTTPConnectionPool, 'https': TimedHTTPSConnectionPool}
+
+    timed_adapter_class = TimedHTTPAdapter
+    return timed_adapter_class
+
+def configure_http_pool(session, pool_size):
+    # Keep up to pool_size connections alive per host. Retries are handled by http_get
+    adapter = get_timed_adapter_class()(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.pool_size = pool_size
+
+def set_rate_limit(rate_limit):
+    # Client-side rate limit, in requests per second. None : no limit
+    global rate_limiter
+    rate_limiter = RateLimiter(rate_limit)
+
+def set_max_connections_per_host(max_per_host):
+    # Max simultaneous connections to one host of the threads backend. None : MAX_CONNECTIONS_PER_HOST
+    global max_connections_per_host
+    max_connections_per_host = max_per_host or MAX_CONNECTIONS_PER_HOST
+
+def ensure_pool_size(pool_size):
+    # Grow the connection pool, so parallel downloads don't open throwaway connections
+    session = get_http_session()
+    with http_session_lock:
+        if pool_size > session.pool_size:
+            configure_http_pool(session, pool_size)
+
+def backoff_delay(attempt, retry_after=None, base=HTTP_BACKOFF):
+    """
+    Seconds to wait before the next attempt.
+
+    The Retry-After header of the server is honoured (seconds or HTTP date). Otherwise
+    exponential backoff with full jitter : random between 0 and base * 2**attempt.
+    """
+    if retry_after:
+        try:
+            return min(HTTP_BACKOFF_MAX, max(0, float(retry_after)))
+        except ValueError:
+            try:
+                return min(HTTP_BACKOFF_MAX, max(0, parsedate_to_datetime(retry_after).timestamp() - time.time()))
+            except (TypeError, ValueError):
+                pass
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, base * 2 ** attempt))
+
+def http_get(url, headers=None, stream=False, timeout=DOWNLOAD_TIMEOUT, retries=HTTP_RETRIES, backoff=HTTP_BACKOFF):
+    """
+    GET through the shared session, with the rate limit and retries.
+
+    Connection errors, timeouts, 429 and 5xx responses are retried with backoff_delay.
+
+    Returns:
+        requests.Response: The response. Its status is not checked, except for retries :
+        after the last attempt, a 429/5xx response is returned as is.
+        For telemetry, `retries` is the number of retries and `connect_seconds` the time spent
+        opening a connection for the last attempt (0 if a kept-alive connection was reused).
+
+    Raises:
+        requests.exceptions.ConnectionError, Timeout: After the last attempt.
+    """
+    from requests.exceptions import ConnectionError, Timeout
+    session = get_http_session()
     attempt = 0
-    while attempt < retries:
+    while True:
+        rate_limiter.acquire()
+        connection_timings.connect = 0.0
         try:
-            response = requests.get(url, timeout=10)  
-            response.raise_for_status() 
-            return response.json()  # Assuming JSON response
-        except ConnectionError as e:
-            logging.error(f"ConnectionError: {e}. Retrying in {delay} seconds...")
-        except Timeout as e:
-            logging.error(f"TimeoutError: {e}. Retrying in {delay} seconds...")
-        except requests.exceptions.HTTPError as e:
-            logging.error(f"HTTPError: {e}. Response code: {e.response.status_code}")
-            break
-        except Exception as e:
-            logging.error(f"An unexpected error occurred: {e}")
-            break
-        
-        time.sleep(delay)  
-        attempt += 1
+            response = session.get(url, headers=headers, stream=stream, timeout=timeout)
+        except (ConnectionError, Timeout) as e:
+            attempt += 1
+            if attempt >= retries:
+                raise
+            delay = backoff_delay(attempt, base=backoff)
+            logging.error(f"{type(e).__name__}: {e}. Retrying in {delay:.1f} seconds...")
+        else:
+            response.retries = attempt
+            response.connect_seconds = connection_timings.connect
+            if response.status_code not in RETRY_STATUS_CODES:
+                return response
+            attempt += 1
+            if attempt >= retries:
+                return response
+            delay = backoff_delay(attempt, response.headers.get('Retry-After'), base=backoff)
+            logging.error(f"HTTP {response.status_code} for {url}. Retrying in {delay:.1f} seconds...")
+            response.close()
+        time.sleep(delay)
+
+def fetch_data_with_retry(url, retries=5, delay=3):
+    """
+    Fetches JSON data from the API, with retries (see http_get).
+
+    Args:
+        url (str): The URL from which to fetch data.
+        retries (int, optional): The maximum number of attempts (default is 5).
+        delay (int, optional): Base delay in seconds of the exponential backoff (default is 3).
 
-    logging.error("Max retries reached. Could not fetch the data.")
+    Returns:
+        dict or list: The parsed JSON response. None if the request failed.
+    """
+    from requests.exceptions import ConnectionError, Timeout, HTTPError
+    start = time.perf_counter()
+    timings = {'kind': 'catalogue', 'url': url}
+    try:
+        response = http_get(url, stream=True, timeout=10, retries=retries, backoff=delay)
+        with response:
+            timings.update(request_timings(response))
+            response.raise_for_status()
+            transfer_start = time.perf_counter()
+            content = response.content
+            timings['transfer'] = time.perf_counter() - transfer_start
+            timings['bytes'] = len(content)
+        record_request(**timings, total=time.perf_counter() - start)
+        return json.loads(content)  # Assuming JSON response
+    except (ConnectionError, Timeout) as e:
+        error = e
+        logging.error(f"{type(e).__name__}: {e}. Max retries reached. Could not fetch the data.")
+    except HTTPError as e:
+        error = e
+        logging.error(f"HTTPError: {e}. Response code: {e.response.status_code}")
+    except Exception as e:
+        error = e
+        logging.error(f"An unexpected error occurred: {e}")
+    record_request(**timings, total=time.perf_counter() - start, error=f"{type(error).__name__}: {error}")
     return None
 
+# ===============================================================
+# Telemetry : timings per request and run report
+# ===============================================================
+def request_timings(response):
+    # Status, retries, connect time and time to first byte (server think time) of a response
+    connect = getattr(response, 'connect_seconds', 0.0)
+    return {
+        'status': response.status_code,
+        'retries': getattr(response, 'retries', 0),
+        'connect': connect,
+        'ttfb': max(0.0, response.elapsed.total_seconds() - connect),
+    }
+
+def percentile(values, p):
+    # Nearest-rank percentile. None if there is no value
+    if not values:
+        return None
+    values = sorted(values)
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+class RunReport:
+    """
+    Telemetry of a run : one record per HTTP request (catalogue and downloads), with its
+    status, bytes, retries and timings (connect, time to first byte, transfer, total), in seconds.
+
+    The run ends with a JSON and a CSV report (see write), and optionally a Prometheus textfile.
+    """
+    FIELDS = ['kind', 'view_id', 'exporter', 'url', 'status', 'bytes', 'retries', 'connect', 'ttfb', 'transfer', 'total', 'error']
+
+    def __init__(self):
+        self.started = datetime.now()
+        self.finished = None
+        self.records = []
+        self._lock = threading.Lock()
+
+    def record(self, **fields):
+        record = dict.fromkeys(self.FIELDS)
+        record.update({key: round(value, 6) if isinstance(value, float) else value for key, value in fields.items()})
+        with self._lock:
+            self.records.append(record)
+
+    def summary(self, slowest=10):
+        """
+        Aggregated stats of the run.
+
+        Returns:
+            dict: Totals, failures by status and exporter, p50/p95 timings overall and per
+            exporter, catalogue requests and the `slowest` downloads.
+        """
+        finished = self.finished or datetime.now()
+        duration = (finished - self.started).total_seconds()
+        with self._lock:
+            records = list(self.records)
+        downloads = [record for record in records if record['kind'] == 'download']
+        succeeded = [record for record in downloads if record['error'] is None]
+        failed = [record for record in downloads if record['error'] is not None]
+        total_bytes = sum(record['bytes'] or 0 for record in succeeded)
+
+        def timings(records):
+            stats = {}
+            for field in ('connect', 'ttfb', 'transfer', 'total'):
+                values = [record[field] for record in records if record[field] is not None]
+                stats[field] = {'p50': percentile(values, 50), 'p95': percentile(values, 95)}
+            return stats
+
+        exporters = {}
+        for exporter in sorted({record['exporter'] for record in downloads}):
+            records_of_exporter = [record for record in succeeded if record['exporter'] == exporter]
+            exporters[exporter] = {
+                'files': len(records_of_exporter),
+                'failed': sum(1 for record in failed if record['exporter'] == exporter),
+                'bytes': sum(record['bytes'] or 0 for record in records_of_exporter),
+                'latency': timings(records_of_exporter)['total'],
+            }
+        by_status = {}
+        for record in failed:
+            status = str(record['status'] or record['error'].split(':')[0])
+            by_status[status] = by_status.get(status, 0) + 1
+        return {
+            'started': self.started.isoformat(timespec='seconds'),
+            'finished': finished.isoformat(timespec='seconds'),
+            'duration_seconds': round(duration, 3),
+            'requests': len(records),
+            'files': sum(1 for record in succeeded if record['status'] != 304),
+            'unchanged': sum(1 for record in succeeded if record['status'] == 304),
+            'failed': len(failed),
+            'retries': sum(record['retries'] or 0 for record in records),
+            'bytes': total_bytes,
+            'bytes_per_sec': round(total_bytes / duration) if duration else None,
+            'files_per_sec': round(len(downloads) / duration, 2) if duration else None,
+            'timings': timings(succeeded),
+            'exporters': exporters,
+            'failures': {
+                'by_status': by_status,
+                'by_exporter': {exporter: stats['failed'] for exporter, stats in exporters.items() if stats['failed']},
+            },
+            'catalogue': [record for record in records if record['kind'] == 'catalogue'],
+            'slowest': [
+                {key: record[key] for key in ('view_id', 'exporter', 'status', 'bytes', 'ttfb', 'transfer', 'total')}
+                for record in sorted(succeeded, key=lambda record: record['total'] or 0, reverse=True)[:slowest]
+            ],
+        }
+
+    def write(self, output_folder, suffix=''):
+        """
+        Writes Output/reports/run-<start time><suffix>.json (summary and requests) and .csv (requests).
+        `suffix` tells apart the reports of runs started at the same time (e.g. shards).
+
+        Returns:
+            str: The path of the JSON report.
+        """
+        self.finished = self.finished or datetime.now()
+        reports_folder = os.path.join(output_folder, REPORTS_FOLDER)
+        os.makedirs(reports_folder, exist_ok=True)
+        # Microseconds : runs started in the same second don't overwrite each other's report
+        base_path = os.path.join(reports_folder, f"run-{self.started.strftime('%Y%m%d-%H%M%S-%f')}{suffix}")
+        with self._lock:
+            records = list(self.records)
+        with open(base_path + '.json', 'w', encoding='utf-8') as file:
+            json.dump({'summary': self.summary(), 'requests': records}, file, indent=1)
+        with open(base_path + '.csv', 'w', encoding='utf-8', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=self.FIELDS)
+            writer.writeheader()
+            writer.writerows(records)
+        return base_path + '.json'
+
+    def write_prometheus(self, path):
+        """
+        Writes the summary in the Prometheus textfile format (node_exporter textfile collector).
+        The file is replaced atomically, so it's never read half written.
+        """
+        summary = self.summary()
+        lines = []
+
+        def metric(name, help, value, labels=None):
+            if value is None:
+                return
+            if not any(line.startswith(f"# HELP {name} ") for line in lines):
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} gauge")
+            labels_text = '{' + ','.join(f'{key}="{value}"' for key, value in labels.items()) + '}' if labels else ''
+            lines.append(f"{name}{labels_text} {value}")
+
+        metric('statbel_export_last_run_timestamp_seconds', "End of the last export run.", round((self.finished or datetime.now()).timestamp()))
+        metric('statbel_export_duration_seconds', "Duration of the last export run.", summary['duration_seconds'])
+        metric('statbel_export_bytes', "Bytes downloaded by the last export run.", summary['bytes'])
+        metric('statbel_export_retries', "Retried requests in the last export run.", summary['retries'])
+        for status in ('files', 'unchanged', 'failed'):
+            metric('statbel_export_files', "Files of the last export run, by result.", summary[status], {'result': status})
+        for exporter, stats in summary['exporters'].items():
+            metric('statbel_export_exporter_files', "Files downloaded by the last export run, by exporter.", stats['files'], {'exporter': exporter})
+            metric('statbel_export_exporter_failures', "Failed files of the last export run, by exporter.", stats['failed'], {'exporter': exporter})
+            for quantile in ('p50', 'p95'):
+                metric('statbel_export_request_seconds', "Request latency of the last export run.",
+                       stats['latency'][quantile], {'exporter': exporter, 'quantile': f"0.{quantile[1:]}"})
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, path)
+
+run_report = None  # RunReport of the current run. None : no telemetry
+
+def start_run_report():
+    # Start collecting the timings of all requests in a new RunReport
+    global run_report
+    run_report = RunReport()
+    return run_report
+
+def record_request(**fields):
+    if run_report is not None:
+        run_report.record(**fields)
+
 # Function to get the file path (works for both Python script and compiled executable)
 def get_file_path(file_name):
     """
@@ -126,14 +557,15 @@ def write_json_to_txt(txtfile, json,header):
     Writes the contents of a JSON-like structure to a text file with a specified format.
 
     Args:
-        json_data (list of dict): A list of dictionaries containing the data to be written.
         txtfile (file-like object): The text file object where the data will be written.
+        json (iterable of dict): The dictionaries containing the data to be written.
         header (str): A header string to display at the beginning of each section.
 
-    The function processes each dictionary in the input `json_data` list and writes its keys and values 
-    into the provided `txtfile`. If a value is itself a dictionary (nested dictionary), its keys and 
-    values are indented and written accordingly. A separator line (`"-" * 50`) is written after each dictionary 
+    The function processes each dictionary in `json` and writes its keys and values
+    into the provided `txtfile`. Nested dictionaries and lists of dictionaries are indented by
+    4 spaces per level, at any depth. A separator line (`"-" * 50`) is written after each dictionary
     to clearly separate entries. The header is written at the beginning of each entry.
+    Each entry is written at once.
 
     Example:
         json_data = [
@@ -141,371 +573,3307 @@ def write_json_to_txt(txtfile, json,header):
             {'name': 'Bob', 'age': 25, 'address': {'city': 'Los Angeles', 'zipcode': '90001'}}
         ]
         with open('output.txt', 'w') as file:
-            write_json_to_txt(json_data, file, 'User Information')
+            write_json_to_txt(file, json_data, 'User Information')
     """
-    # Based on json datas
-    for data in json:
-        txtfile.write(f"--- {header} ---\n")
+    def lines(data, indent):
         for key, value in data.items():
             if isinstance(value, dict):  # If the value is a nested dictionary
-                txtfile.write(f"{key}:\n")
-                for subkey, subvalue in value.items():
-                    txtfile.write(f"    {subkey}: {subvalue}\n")
+                yield f"{indent}{key}:\n"
+                yield from lines(value, indent + "    ")
+            elif isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+                yield f"{indent}{key}:\n"
+                for item in value:
+                    yield from lines(item, indent + "    ")
+                    yield f"{indent}    --\n"
             else:
-                txtfile.write(f"{key}: {value}\n")
-        txtfile.write("-" * 50 + "\n")
+                yield f"{indent}{key}: {value}\n"
+
+    # Based on json datas
+    for data in json:
+        txtfile.write(f"--- {header} ---\n" + "".join(lines(data, "")) + "-" * 50 + "\n")
+
+class Datasource:
+    """A datasource of the API. `data` is the raw json."""
+    __slots__ = ('id', 'name', 'data')
+
+    def __init__(self, data):
+        self.id = data['id']
+        self.name = data['name']
+        self.data = data
+
+class View:
+    """A view (exportable dataset) of the API. `data` is the raw json."""
+    __slots__ = ('id', 'name', 'locale', 'datasource_id', 'sort_key', 'data')
+
+    def __init__(self, data):
+        self.id = data['id']
+        self.name = data['name']
+        self.locale = data.get('locale')
+        self.datasource_id = data.get('dataSourceId')
+        self.sort_key = (self.name.lower(), self.id)  # Case insensitive name. The id makes the order total
+        self.data = data
+
+class Catalogue:
+    """
+    Datasources and views of the API, indexed once when loaded.
+
+    Attributes:
+        datasources (list of Datasource): In API order.
+        views (list of View): In API order.
+        views_by_id (dict): View id -> View.
+        views_by_datasource (dict): Datasource id -> list of View.
+        views_by_locale (dict): Locale -> list of View.
+        views_by_name (dict): Name -> list of View (views in several locales may share a name).
+
+    The search index (see search) is only built on the first search.
+    """
+    def __init__(self, datasources, views):
+        self.datasources = [Datasource(data) for data in datasources]
+        self.views = [View(data) for data in views]
+        self.views_by_id = {}
+        self.views_by_datasource = {}
+        self.views_by_locale = {}
+        self.views_by_name = {}
+        for view in self.views:
+            self.views_by_id[view.id] = view
+            self.views_by_datasource.setdefault(view.datasource_id, []).append(view)
+            self.views_by_locale.setdefault(view.locale, []).append(view)
+            self.views_by_name.setdefault(view.name, []).append(view)
+        self._sorted_views = {}  # Cache of sorted_views, by locale
+        self._search_words = None  # Sorted words of the search index
+        self._search_postings = None  # Word -> ids of the views with this word
+        self._prefix_matches = {}  # Cache : prefix -> ids of the views with a word starting with it
+
+    def sorted_views(self, locales=None):
+        """
+        Views sorted alphabetically by name (case insensitive).
+
+        Args:
+            locales (list of str, optional): Only views in these locales. All views if None.
+
+        Returns:
+            list of View: Sorting is done once per locale, then merged (once per set of locales).
+        """
+        if locales is None:
+            if None not in self._sorted_views:
+                self._sorted_views[None] = sorted(self.views, key=lambda view: view.sort_key)
+            return self._sorted_views[None]
+        for locale in locales:
+            if locale not in self._sorted_views:
+                self._sorted_views[locale] = sorted(self.views_by_locale.get(locale, []), key=lambda view: view.sort_key)
+        if len(locales) == 1:
+            return self._sorted_views[locales[0]]
+        key = tuple(sorted(set(locales)))
+        if key not in self._sorted_views:
+            self._sorted_views[key] = list(heapq.merge(*(self._sorted_views[locale] for locale in key), key=lambda view: view.sort_key))
+        return self._sorted_views[key]
 
-def create_metadata() :
+    def build_search_index(self):
+        # Words of the view names and of their datasource names, each with the ids of its views
+        datasource_names = {datasource.id: datasource.name for datasource in self.datasources}
+        postings = {}
+        for view in self.views:
+            for word in set(search_words(f"{view.name} {datasource_names.get(view.datasource_id, '')}")):
+                postings.setdefault(word, []).append(view.id)
+        self._search_postings = postings
+        self._search_words = sorted(postings)
+
+    def prefix_matches(self, prefix):
+        """
+        Ids of the views with a word starting with `prefix` (a word of search_words).
+
+        Words starting with the prefix are contiguous in the sorted words : found by bisection.
+        """
+        matches = self._prefix_matches.get(prefix)
+        if matches is None:
+            if self._search_words is None:
+                self.build_search_index()
+            start = bisect.bisect_left(self._search_words, prefix)
+            end = bisect.bisect_left(self._search_words, prefix + '\uffff', start)
+            matches = set()
+            for word in self._search_words[start:end]:
+                matches.update(self._search_postings[word])
+            if len(self._prefix_matches) > 10000:
+                self._prefix_matches.clear()
+            self._prefix_matches[prefix] = matches
+        return matches
+
+    def search(self, query, locales=None):
+        """
+        Views matching a search, sorted like sorted_views.
+
+        Every word of `query` must start a word of the view name or of its datasource name,
+        case and accent insensitive : 'evol pop' finds 'Évolution de la population'.
+
+        Args:
+            query (str): The search. All views if empty.
+            locales (list of str, optional): Only views in these locales. All views if None.
+
+        Returns:
+            list of View: The matching views.
+        """
+        views = self.sorted_views(locales)
+        words = search_words(query)
+        if not words:
+            return views
+        # Intersect from the smallest set
+        matches = sorted((self.prefix_matches(word) for word in set(words)), key=len)
+        matches = matches[0].intersection(*matches[1:])
+        if len(matches) * 8 < len(views):
+            # Few matches : sort them rather than going through all the views
+            locales = set(locales) if locales is not None else None
+            return sorted((self.views_by_id[view_id] for view_id in matches
+                           if locales is None or self.views_by_id[view_id].locale in locales), key=lambda view: view.sort_key)
+        return [view for view in views if view.id in matches]
+
+    def select(self, languages=None, names=None, pattern=None):
+        """
+        Filters views. Only the given filters are applied.
+
+        Args:
+            languages (list of str, optional): Keep views in these locales.
+            names (list of str, optional): Keep views with these names.
+            pattern (str, optional): Keep views whose name matches this regular expression.
+
+        Returns:
+            list of View: The matching views.
+        """
+        # Start from the smallest index, then check the other filters
+        if names is not None:
+            candidates = [view for name in dict.fromkeys(names) for view in self.views_by_name.get(name, [])]
+        elif languages is not None:
+            candidates = [view for locale in dict.fromkeys(languages) for view in self.views_by_locale.get(locale, [])]
+        else:
+            candidates = self.views
+        if languages is not None:
+            languages = set(languages)
+        regex = re.compile(pattern) if pattern else None
+        return [
+            view for view in candidates
+            if (languages is None or view.locale in languages)
+            and (regex is None or regex.search(view.name))
+        ]
+
+def search_words(text):
+    # Lowercase words without accents : 'Évolution des prix' -> ['evolution', 'des', 'prix']
+    text = unicodedata.normalize('NFKD', text.lower())
+    return re.findall(r'\w+', ''.join(char for char in text if not unicodedata.combining(char)))
+
+def create_metadata(catalogue, output_folder) :
     # --- Create medatata.txt to inform users
-    Metadata_path = os.path.join(outputFolder,'metadata.txt')
+    Metadata_path = os.path.join(output_folder,'metadata.txt')
     with open(Metadata_path, 'w') as file:
-        write_json_to_txt(file, datasources,'Datasource')
-        write_json_to_txt(file, views,'View')
-    metadata_lb.config(text=f"Export done ! See {Metadata_path}")
+        write_json_to_txt(file, [data_source.data for data_source in catalogue.datasources],'Datasource')
+        write_json_to_txt(file, [view.data for view in catalogue.views],'View')
+    return Metadata_path
 
-def create_linked_views_metadata() :
-    Metadata_path = os.path.join(outputFolder,'linked_views.txt')
+def create_linked_views_metadata(catalogue, output_folder) :
+    Metadata_path = os.path.join(output_folder,'linked_views.txt')
     with open(Metadata_path, 'w') as file:
         # Link views to the corresponding data sources and write to the file
-        for data_source in datasources:
-            # Find all views that are linked to the current data source
-            linked_views = [view for view in views if view["dataSourceId"] == data_source["id"]]
+        for data_source in catalogue.datasources:
+            # Views that are linked to the current data source (indexed once)
+            linked_views = catalogue.views_by_datasource.get(data_source.id, [])
             
             # Write the data source and its linked views to the file
-            file.write(f"Data Source ID: {data_source['id']}\n")
-            file.write(f"Data Source Name: {data_source['name']}\n")
+            file.write(f"Data Source ID: {data_source.id}\n")
+            file.write(f"Data Source Name: {data_source.name}\n")
             file.write("Linked Views:\n")
             
             if linked_views:
                 for view in linked_views:
-                    file.write(f"  - View ID: {view['id']}, View Name: {view['name']}\n")
+                    file.write(f"  - View ID: {view.id}, View Name: {view.name}\n")
             else:
                 file.write("  No linked views.\n")
             
             file.write("===================================\n")
-    metadatalk_lb.config(text=f"Results have been written to {Metadata_path}")
+    return Metadata_path
 
+# --- Machine readable metadata : NDJSON, CSV and SQLite, streamed record by record
+def flatten_record(data, prefix=''):
+    """
+    Flattens nested dictionaries, at any depth, with dotted keys : {'description': {'fr': 'x'}} -> {'description.fr': 'x'}.
+    Lists are kept as JSON text.
+    """
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_record(value, name + '.'))
+        elif isinstance(value, list):
+            flat[name] = json.dumps(value, ensure_ascii=False)
+        else:
+            flat[name] = value
+    return flat
 
-def export_views() :
-    # Function to print selected exporters and languages
-    # Get selected values
-    selected_exporters = [VALID_EXPORTERS[i] for i, var in enumerate(exporter_vars) if var.get()]
-    selected_languages = [VALID_LANGUAGES[i] for i, var in enumerate(lang_vars) if var.get()]
-    selected_view =  [views_listbox.get(i) for i in views_listbox.curselection()]
+def datasource_records(catalogue):
+    # Raw json of the datasources, in API order
+    for datasource in catalogue.datasources:
+        yield datasource.data
 
-    # check if a format is selected
-    if not selected_exporters :
-        export_progress_bar_lb.config(text=f"Please select format")
-        return
+def view_records(catalogue):
+    # Raw json of the views, in API order
+    for view in catalogue.views:
+        yield view.data
+
+def linked_view_records(catalogue):
+    """
+    Join table of the datasources and their views : one record per (datasource, view).
+
+    Datasources without view have a record with no view, and views whose datasource is
+    unknown a record with no datasource name, so nothing is lost (full outer join).
+    """
+    datasource_ids = set()
+    for datasource in catalogue.datasources:
+        datasource_ids.add(datasource.id)
+        linked_views = catalogue.views_by_datasource.get(datasource.id, [])
+        if not linked_views:
+            yield {'datasource_id': datasource.id, 'datasource_name': datasource.name, 'view_id': None, 'view_name': None, 'view_locale': None}
+        for view in linked_views:
+            yield {'datasource_id': datasource.id, 'datasource_name': datasource.name, 'view_id': view.id, 'view_name': view.name, 'view_locale': view.locale}
+    for view in catalogue.views:
+        if view.datasource_id not in datasource_ids:
+            yield {'datasource_id': view.datasource_id, 'datasource_name': None, 'view_id': view.id, 'view_name': view.name, 'view_locale': view.locale}
+
+METADATA_TABLES = {
+    'datasources': datasource_records,
+    'views': view_records,
+    'linked_views': linked_view_records,
+}
+
+def record_fields(records):
+    # Columns of flattened records, in order of first appearance
+    fields = {}
+    for record in records:
+        fields.update(dict.fromkeys(flatten_record(record)))
+    return list(fields)
+
+def ndjson_lines(records):
+    """
+    Generator of NDJSON lines : one json object per record, nesting kept.
+
+    Example:
+        >>> for line in ndjson_lines(view_records(catalogue)): ...
+    """
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+def csv_lines(records, fields):
+    """
+    Generator of CSV lines (header first) : nested fields flattened (see flatten_record).
+
+    Args:
+        records (iterable of dict): The records.
+        fields (list of str): The columns, e.g. record_fields(records) if the records can be read twice.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction='ignore')
+    writer.writeheader()
+    yield buffer.getvalue()
+    for record in records:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(flatten_record(record))
+        yield buffer.getvalue()
+
+def write_lines(path, lines):
+    # Buffered write of generated lines. Written to a temp file first, then renamed
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8', newline='', buffering=1024 * 1024) as file:
+        file.writelines(lines)
+    os.replace(tmp_path, path)
 
-    # If selected_view is not empty, filter filtered_views by the selected_view values
-    if selected_view:
-        filtered_views = [view for view in views if view['name'] in selected_view]
-    else :
-        # Filter views by the selected languages
-        filtered_views = [view for view in views if view['locale'] in selected_languages]
-    # Calculate the total number of views to process
-    total_items = len(filtered_views) * len(selected_exporters)
-    processed_items = 0
-    start_time = datetime.now()
-
-    # Init progressBar
-    expected_duration = total_items * 1
-    export_progress_bar_lb.config(text=f"Exporting {total_items} files. Expected duration : {expected_duration//3600} hour(s), {(expected_duration%3600)//60} min, {expected_duration%60} sec") 
-    export_progress_bar['value'] = 0  # Reset the progress bar
-    root.update_idletasks()  # Update the window
-
-    error_occurred = False  # Flag to check if any error occurred
-    # --- Iterate through each dataset and export it
-    for exporter in selected_exporters :
+def sqlite_columns(fields):
+    """
+    SQLite column names of fields. Column names are case insensitive in SQLite : a field differing
+    from a previous one only by case (e.g. 'Id' after 'id') gets a number ('Id_2').
+
+    Returns:
+        dict: field -> column name, in the order of the fields.
+    """
+    columns = {}
+    used = set()
+    for field in fields:
+        column = field
+        number = 1
+        while column.lower() in used:
+            number += 1
+            column = f"{field}_{number}"
+        used.add(column.lower())
+        columns[field] = column
+    return columns
+
+def write_metadata_sqlite(catalogue, path):
+    """
+    Writes the datasources, views and linked_views tables (see METADATA_TABLES) in a SQLite database.
+
+    Nested fields are flattened (see flatten_record) into columns (see sqlite_columns). Rows are
+    streamed to SQLite in one transaction, and the id columns are indexed. A table without
+    records only has an 'id' column.
+    """
+    import sqlite3
+    tmp_path = path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    connection = sqlite3.connect(tmp_path)
+    try:
+        with connection:
+            for table, records in METADATA_TABLES.items():
+                fields = record_fields(records(catalogue))
+                columns = sqlite_columns(fields or ['id'])
+                columns_sql = ', '.join('"' + column.replace('"', '""') + '"' for column in columns.values())
+                connection.execute(f'CREATE TABLE "{table}" ({columns_sql})')
+                if fields:
+                    rows = (tuple(record.get(field) for field in fields) for record in map(flatten_record, records(catalogue)))
+                    connection.executemany(f'INSERT INTO "{table}" VALUES ({", ".join("?" * len(fields))})', rows)
+                for field in ('id', 'datasource_id', 'view_id', 'dataSourceId'):
+                    if field in columns:
+                        connection.execute(f'CREATE INDEX "{table}_{field}" ON "{table}" ("{columns[field]}")')
+    finally:
+        connection.close()
+    os.replace(tmp_path, path)
+
+def export_metadata(catalogue, output_folder, formats=METADATA_FORMATS):
+    """
+    Exports the metadata in the given formats.
+
+    - txt : metadata.txt and linked_views.txt in `output_folder` (see create_metadata).
+    - ndjson, csv : datasources, views and linked_views files in `output_folder`/metadata.
+    - sqlite : `output_folder`/metadata/metadata.sqlite, with the 3 tables.
+
+    Returns:
+        list of str: The paths of the written files.
+    """
+    paths = []
+    if 'txt' in formats:
+        paths.append(create_metadata(catalogue, output_folder))
+        paths.append(create_linked_views_metadata(catalogue, output_folder))
+    metadata_folder = os.path.join(output_folder, METADATA_FOLDER)
+    if set(formats) - {'txt'}:
+        os.makedirs(metadata_folder, exist_ok=True)
+    for table, records in METADATA_TABLES.items():
+        if 'ndjson' in formats:
+            paths.append(os.path.join(metadata_folder, f"{table}.ndjson"))
+            write_lines(paths[-1], ndjson_lines(records(catalogue)))
+        if 'csv' in formats:
+            paths.append(os.path.join(metadata_folder, f"{table}.csv"))
+            write_lines(paths[-1], csv_lines(records(catalogue), record_fields(records(catalogue))))
+    if 'sqlite' in formats:
+        paths.append(os.path.join(metadata_folder, 'metadata.sqlite'))
+        write_metadata_sqlite(catalogue, paths[-1])
+    return paths
+
+
+class DownloadProgress:
+    """
+    Thread-safe progress accounting shared by all download workers.
+
+    Attributes:
+        total (int): Number of files to download.
+        done (int): Number of files successfully downloaded.
+        failed (int): Number of files that could not be downloaded.
+        unchanged (int): Number of files skipped because they didn't change (incremental sync).
+        bytes (int): Number of bytes downloaded.
+        deduplicated (int): Number of downloaded files whose content was already stored (deduplication).
+        skipped (int): Number of files not requested because they failed in previous runs (see plan_export).
+        failed_tasks (list of dict): The tasks of the failed files, e.g. to retry them, with the HTTP
+            'status' of the failure (None if the server didn't answer).
+        planned_work (float): Estimated seconds to download all files one after the other (see plan_export).
+            0 if unknown.
+    """
+    def __init__(self, total, planned_work=0.0, workers=1):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.unchanged = 0
+        self.bytes = 0
+        self.deduplicated = 0
+        self.skipped = 0
+        self.failed_tasks = []
+        self.planned_work = planned_work
+        self.work_done = 0.0  # Estimated seconds of the processed files
+        self.workers = workers
+        self.start_time = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, success, nbytes=0, unchanged=False, duplicate=False, planned=0.0, task=None):
+        with self._lock:
+            self.work_done += planned
+            if unchanged:
+                self.unchanged += 1
+            elif success:
+                self.done += 1
+                self.bytes += nbytes
+                self.deduplicated += duplicate
+            else:
+                self.failed += 1
+                if task is not None:
+                    self.failed_tasks.append(task)
+
+    @property
+    def processed(self):
+        return self.done + self.failed + self.unchanged
+
+    @property
+    def percentage(self):
+        return (self.processed / self.total) * 100 if self.total else 100
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.start_time
+
+    def eta(self):
+        """
+        Estimates the remaining seconds.
+
+        With a plan, the estimates of the files processed so far are compared to the actual
+        elapsed time, so the largest files coming first don't skew the estimate. Otherwise,
+        from the number of files processed so far.
+
+        Returns:
+            float: Remaining seconds. None until a file has been processed, if there is no plan.
+        """
+        if self.planned_work:
+            if not self.work_done:
+                return self.planned_work / self.workers
+            return self.elapsed * max(0.0, self.planned_work - self.work_done) / self.work_done
+        if not self.processed:
+            return None
+        return self.elapsed / self.processed * (self.total - self.processed)
+
+class ExportControl:
+    """
+    Lets another thread (e.g. the GUI) pause, resume or cancel a running export.
+
+    Files being downloaded are finished. The next ones wait while paused, and are skipped once cancelled.
+    """
+    def __init__(self):
+        self._running = threading.Event()
+        self._running.set()
+        self._cancelled = threading.Event()
+
+    def pause(self):
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def cancel(self):
+        self._cancelled.set()
+        self._running.set()  # Wake up paused workers, so they can stop
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def wait(self):
+        """
+        Blocks while the export is paused.
+
+        Returns:
+            bool: False if the export was cancelled.
+        """
+        self._running.wait()
+        return not self.cancelled
+
+    async def async_wait(self):
+        # wait() for the async backend : doesn't block the event loop
+        import asyncio
+        while self.paused:
+            await asyncio.sleep(0.1)
+        return not self.cancelled
+
+def build_export_tasks(views_to_export, exporters, output_folder, compression=None, compression_level=None):
+    """
+    Builds the list of files to download : one task per (view, exporter).
+
+    Views with the same name are exported to the same file : only the last of them is kept
+    (as when files were downloaded one after another), so parallel downloads never write the same file.
+
+    Args:
+        views_to_export (list of View): Views to export.
+        exporters (list of str): Formats to export, from VALID_EXPORTERS.
+        output_folder (str): Folder where a sub-folder per exporter is created.
+        compression (str, optional): 'gzip' or 'zstd' to compress the COMPRESSIBLE_EXPORTERS files.
+        compression_level (int, optional): Level of the codec. Its default level if None.
+
+    Returns:
+        list of dict: Tasks with keys 'id', 'exporter', 'url', 'path', 'compression' and 'compression_level'.
+    """
+    tasks = {}  # By path
+    for exporter in exporters :
         # Create a folder for each exporter if it doesn't exist
-        exporter_folder = os.path.join(outputFolder,exporter)
+        exporter_folder = os.path.join(output_folder,exporter)
         os.makedirs(exporter_folder, exist_ok=True)
-        for view in filtered_views:
-            # - Export Dataset in multiple formats
-            id = view['id']
-            name = sanitize_filename(view['name'])
-            url = f"{API_URL}/views/{id}/result/{exporter}"
-            local_filename = os.path.join(exporter_folder, f"{name}.{exporter}")
-            # Download and save the file
-            # Try to download and save the file, continue on error
+        file_compression = compression if exporter in COMPRESSIBLE_EXPORTERS else None
+        for view in views_to_export:
+            id = view.id
+            path = export_path(output_folder, view, exporter, file_compression)
+            tasks[os.path.normcase(path)] = {
+                'id': id,
+                'exporter': exporter,
+                'url': f"{API_URL}/views/{id}/result/{exporter}",
+                'path': path,
+                'compression': file_compression,
+                'compression_level': compression_level if file_compression else None,
+            }
+    return list(tasks.values())
+
+def export_path(output_folder, view, exporter, compression=None):
+    # Where a view is exported : Output/<FORMAT>/<view name>.<FORMAT>, + .gz/.zst if compressed
+    path = os.path.join(output_folder, exporter, f"{sanitize_filename(view.name)}.{exporter}")
+    if compression and exporter in COMPRESSIBLE_EXPORTERS:
+        path += COMPRESSION_SUFFIXES[compression]
+    return path
+
+def find_export(output_folder, view, exporter):
+    """
+    Finds the exported file of a view, compressed or not.
+
+    Returns:
+        str: The most recent of the raw, .gz and .zst files. None if the view wasn't exported in this format.
+    """
+    candidates = [export_path(output_folder, view, exporter, compression) for compression in [None, *COMPRESSION_SUFFIXES]]
+    existing = [path for path in candidates if os.path.exists(path)]
+    return max(existing, key=os.path.getmtime) if existing else None
+
+# --- State files (manifest, history) : concurrent runs on the same Output folder (e.g. `--lang fr`
+# and `--lang nl`) each save their own changes. Saving merges them into the file as it is now
+state_file_bases = {}  # Path -> entries as loaded by this process, to find the changes of the run
+state_file_bases_lock = threading.Lock()
+
+class FileLock:
+    """
+    Lock between processes on a file : `<path>.lock` is created exclusively while it is held.
+    A lock older than STATE_LOCK_TIMEOUT was left by a crashed run, and is taken over.
+
+    Example:
+        >>> with FileLock(manifest_path):
+        ...     rewrite the manifest
+    """
+    def __init__(self, path, timeout=STATE_LOCK_TIMEOUT):
+        self.lock_path = path + '.lock'
+        self.timeout = timeout
+        self._fd = None
+
+    def __enter__(self):
+        while True:
             try:
-                urllib.request.urlretrieve(url, local_filename)
-                #print(f"File successfully saved to {local_filename}")
-            except Exception as e:
-                # Log the error
-                logging.error(f"Error downloading {url}: {e}")
-                error_occurred = True
-                continue  # Continue with the next exporter
+                self._fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                return self
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.lock_path) > self.timeout:
+                        logging.error(f"Removing the stale lock {self.lock_path}")
+                        os.remove(self.lock_path)
+                        continue
+                except OSError:
+                    continue  # Released in the meantime
+            time.sleep(0.05)
 
-            
-            # Update Progressbar
-            processed_items += 1
-            progress_percentage = (processed_items / total_items) * 100
-            export_progress_bar['value'] = progress_percentage
-            root.update_idletasks()  # Update the window to reflect the changes
-
-    duration = datetime.now() - start_time
-    # Ensure progress bar reaches 100% at the end. When errors, it doesn't reach 100%, it's why we force it
-    export_progress_bar['value'] = 100
-    root.update_idletasks()  # Make sure the GUI reflects the final update
-
-    # Update progress label based on whether an error occurred
-    if error_occurred:
-        export_progress_bar_lb.config(text=f"Export Done with errors! Duration: {duration.days*24 + duration.seconds//3600} hour(s), {(duration.seconds//60)%60} min, {duration.seconds%60} sec. Check 'export_errors.log' for details.")
-    else:
-        export_progress_bar_lb.config(text=f"Export Done! Duration: {duration.days*24 + duration.seconds//3600} hour(s), {(duration.seconds//60)%60} min, {duration.seconds%60} sec")
+    def __exit__(self, *exc):
+        os.close(self._fd)
+        os.remove(self.lock_path)
 
-def export_all_views() :
-    # --- Iterate through each dataset and export it
-    for exporter in VALID_EXPORTERS :
-        # Create a folder for each exporter if it doesn't exist
-        exporter_folder = os.path.join(outputFolder,exporter)
-        os.makedirs(exporter_folder, exist_ok=True)
-        for view in views:
-            # - Export Dataset in multiple formats
-            id = view['id']
-            name = sanitize_filename(view['name'])
-            url = f"{API_URL}/views/{id}/result/{exporter}"
-            local_filename = os.path.join(exporter_folder, f"{name}.{exporter}")
-            # Download and save the file
-            # Try to download and save the file, continue on error
+def load_state_file(path, description):
+    """
+    Loads a json state file (dict of entries), and remembers it as loaded (see save_state_file).
+
+    Returns:
+        dict: The entries. Empty if the file doesn't exist or is broken.
+    """
+    entries = {}
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                entries = json.load(file)
+        except (OSError, ValueError) as e:
+            # A broken state file only means starting from scratch
+            logging.error(f"Could not read {description} {path}: {e}. Starting from scratch.")
+    with state_file_bases_lock:
+        state_file_bases[os.path.abspath(path)] = json.loads(json.dumps(entries))
+    return entries
+
+def save_state_file(entries, path, **json_options):
+    """
+    Saves the changes of this run to a state file loaded with load_state_file.
+
+    Under a FileLock, the file is read again and only the entries this run added, changed or
+    removed since it was loaded are applied : entries saved in the meantime by another run are
+    kept. Written to a temp file first, so an interrupted run never leaves a broken file.
+    """
+    key_path = os.path.abspath(path)
+    with FileLock(path):
+        with state_file_bases_lock:
+            base = state_file_bases.get(key_path)
+        merged = entries
+        if base is not None and os.path.exists(path):
             try:
-                urllib.request.urlretrieve(url, local_filename)
-                #print(f"File successfully saved to {local_filename}")
-            except Exception as e:
-                # Log the error
-                logging.error(f"Error downloading {url}: {e}")
-                continue  # Continue with the next exporter
-
-def update_views_listbox():
-    # Clear the current items in the Listbox
-    views_listbox.delete(0, tk.END)
-    # Get selected values
-    selected_languages = [VALID_LANGUAGES[i] for i, var in enumerate(lang_vars) if var.get()]
-    # Filter views by the selected languages
-    filtered_views = [view for view in views if view['locale'] in selected_languages]
-    # Sort the filtered views alphabetically by 'name'
-    sorted_filtered_views = sorted(filtered_views, key=lambda view: view['name'].lower())
-    for item in sorted_filtered_views:
-        views_listbox.insert(tk.END, item['name'])
-
-# Function to show the popup and stop the script
-def show_error_and_exit(message):
-    root = tk.Tk()
-    root.withdraw()  # Hide the root window
-    messagebox.showerror("Error", message)
-    sys.exit(1)  # Stop the script
-        
-# ===============================================================
-# Init script : Create Output and get api json
-# ===============================================================
-# -- Create Output folder
-outputFolder = get_file_path("Output")
-os.makedirs(outputFolder, exist_ok=True)
-# -- Setup logging configuration
-log_file = os.path.join(outputFolder, 'export_errors.log')
-logging.basicConfig(filename=log_file, level=logging.ERROR, 
-                    format='%(asctime)s - %(levelname)s - %(message)s')
-# --- Send a GET request to fetch the raw JSON data with all views (to get ids)
-# Datasource are not exportable. Views are. Each views is linked, via ID, to a datasource
-datasources = fetch_data_with_retry(f"{API_URL}/datasources")
-views = fetch_data_with_retry(f"{API_URL}/views")
-# if cannont get data : stop script
-if datasources is None or views is None:
-    show_error_and_exit(f"Datasources or Views data is missing. Please check the logfile ({outputFolder})")
+                with open(path, 'r', encoding='utf-8') as file:
+                    merged = json.load(file)
+            except (OSError, ValueError):
+                merged = {}
+            for key in base.keys() - entries.keys():
+                merged.pop(key, None)
+            for key, value in entries.items():
+                if base.get(key) != value:
+                    merged[key] = value
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(merged, file, sort_keys=True, **json_options)
+        os.replace(tmp_path, path)
+    # Saved again later : only the changes made after this save are applied
+    with state_file_bases_lock:
+        state_file_bases[key_path] = json.loads(json.dumps(entries))
 
-# ===============================================================
-# Init Window
-# ===============================================================
-root = tk.Tk()
-root.title("StatBel_OpenDatasets")
-root.state('zoomed')  # This will maximize the window
-# Set the window to fullscreen
-#root.attributes('-fullscreen', True)
-#root.bind("<Escape>", lambda event: root.attributes('-fullscreen', False))
-# Create a Notebook widget
-notebook = ttk.Notebook(root)
-notebook.pack(fill='both', expand=True)
-style = ttk.Style()
-style.configure(
-    'TNotebook.Tab',
-    font=('Arial', 16, 'bold'),
-    padding=(20, 10),
-    borderwidth=21,
-    relief='solid',
-    background='lightblue',
-    foreground='black',
-    highlightthickness=10,
-    highlightcolor='red',
-    highlightbackground='gray'
-)
+def load_manifest(output_folder):
+    """
+    Loads the incremental sync manifest of an output folder.
 
-# ===============================================================
-# Tab 0 : ReadMe/About
-# ===============================================================
-# Create my tab
-tab0 = ttk.Frame(notebook)
-notebook.add(tab0, text='About' )
-
-# Adding a Text widget to ReadMe_frame
-text_widget_tab0 = tk.Text(tab0, wrap='word' , bg=style.lookup("TFrame", "background"), fg='Black', bd=0)
-# Text
-Text_tab0 = """
-    StatBel Open Datasets Tool
+    The manifest records, per (view id, exporter), the ETag/Last-Modified sent by the API,
+    the size and sha256 of the downloaded file and when it was downloaded.
 
-    This tool allows you to retrieve and export datasets from the Belgian Statistical Office's StatBel API in various formats.
+    Returns:
+        dict: The manifest entries, keyed by manifest_key(). Empty if there is no manifest yet.
+    """
+    return load_state_file(os.path.join(output_folder, MANIFEST_FILENAME), 'manifest')
 
-    Key Features:
-    - Export Metadata: Retrieve information about available datasets.
-    - Export All Views: Download all datasets (all languages) in selected formats (XML, JSON, CSV, XLS, HTML, PDF).
-    - Export Specific Views: 
-        Filtered by Language: French, English, Dutch, or German.
-        Individually selected.
-        In selected format.
+def save_manifest(manifest, output_folder):
+    # Only the changes of this run are saved (see save_state_file)
+    save_state_file(manifest, os.path.join(output_folder, MANIFEST_FILENAME), indent=1)
 
-    Usage:
-    1. Export Metadata: Click "Export Metadata" to generate a text file with dataset information.
-    2. Export Views: In the "Export Views" tab, select formats and languages, then click "Export Views" to download your data.
+def manifest_key(view_id, exporter):
+    return f"{view_id}/{exporter}"
 
-    Author: Ronaf-Git
-    For more information, visit: https://github.com/Ronaf-git/StatBel_OpenDatasets
-"""
-text_widget_tab0.insert(tk.END,Text_tab0) 
-# Set the Text widget to "disabled" to make it unwritable
-text_widget_tab0.config(state=tk.DISABLED)
-text_widget_tab0.bind("<FocusIn>", lambda e: text_widget_tab0.config(state=tk.DISABLED))
-# pack it
-text_widget_tab0.pack(fill="both", expand=True)
-
-
-# ==============================================================================================================================
-# Tab 1 : Get Metadatas
-# ==============================================================================================================================
-# Create Tab
-tab1 = ttk.Frame(notebook)
-notebook.add(tab1, text='Metadata' )
-# --- metadata : button and label
-# Create Button 
-metadata_bt = tk.Button(tab1, text="Export metadata", command=create_metadata)
-metadata_bt.grid(row=1, column=0, sticky="nsew", padx=10, pady=10)
-# Create Label 
-metadata_lb = tk.Label(tab1, text="Export metadata (Datasources and views) in a texte file", font=("Helvetica", 14, "bold"))
-metadata_lb.grid(row=0, column=0, sticky="nsew", padx=10, pady=5)
-
-# --- relationnal link between datasources and views : button and label
-# Create Button 
-metadatalk_bt = tk.Button(tab1, text="Export relationnal metadata", command=create_linked_views_metadata)
-metadatalk_bt.grid(row=3, column=0, sticky="nsew", padx=10, pady=10)
-# Create Label 
-metadatalk_lb = tk.Label(tab1, text="Show relations between datasources and views", font=("Helvetica", 14, "bold"))
-metadatalk_lb.grid(row=2, column=0, sticky="nsew", padx=10, pady=5)
-
-# ===============================================================================================================
-# Tab 2 : All datas
-# ===============================================================================================================
-tab2 = ttk.Frame(notebook)
-notebook.add(tab2, text='Export All Views')
-
-# --- export ALL views : button and label
-# Create Button 
-export_all_bt = tk.Button(tab2, text="Export ALL views", command=create_metadata)
-export_all_bt.grid(row=3, column=0, sticky="nsew", padx=10, pady=10)
-# Create Label 
-export_all_lb = tk.Label(tab2, text="Export all views (all languages/format). Will be long.", font=("Helvetica", 14, "bold"))
-export_all_lb.grid(row=2, column=0, sticky="nsew", padx=10, pady=5)
-
-# ===============================================================================================================
-# Tab 3 : dédicated Views
-# ===============================================================================================================
-# --- Create Tab
-tab3 = ttk.Frame(notebook)
-notebook.add(tab3, text='Export selected views')
-
-# Configure the grid to allow widgets to expand properly
-for i in range(20):
-    tab3.grid_rowconfigure(i, weight=1)
-for i in range(0):
-    tab3.grid_columnconfigure(i, weight=1)
-
-# --- Exporters : Checkbuttons and label
-# Create Label
-exporters_lb = tk.Label(tab3, text="Format selector", font=("Helvetica", 14, "bold"))
-exporters_lb.grid(row=0, column=2, sticky="nsew", padx=10, pady=5)
-# Frame to contain all Exporter Checkbuttons (for horizontal layout)
-exporters_frame = tk.Frame(tab3)
-exporters_frame.grid(row=1, column=2, sticky="nsew", padx=10, pady=5)
-# Variables to track selected exporters
-exporter_vars = []
-for item in VALID_EXPORTERS:
-    exporter_vars.append(tk.BooleanVar(value=False))  # Each variable tracks if it's selected
-# Create Checkbuttons for each exporter inside the exporters_frame (horizontal layout)
-for idx, (item, var) in enumerate(zip(VALID_EXPORTERS, exporter_vars)):
-    cb = tk.Checkbutton(exporters_frame, text=item, variable=var, font=("Helvetica", 12))
-    cb.grid(row=0, column=idx, sticky="w", padx=10, pady=5)  # All checkbuttons in row 0, columns 0,1,2...
-
-# --- Lang : Checkbuttons and label
-# Create Label
-Lang_lb = tk.Label(tab3, text="Language selector", font=("Helvetica", 14, "bold"))
-Lang_lb.grid(row=2, column=2, sticky="nsew", padx=10, pady=5)
-# Frame to contain all Language Checkbuttons (for horizontal layout)
-lang_frame = tk.Frame(tab3)
-lang_frame.grid(row=3, column=2, sticky="nsew", padx=10, pady=5)
-# Variables to track selected languages
-lang_vars = []
-for item in VALID_LANGUAGES:
-    lang_vars.append(tk.BooleanVar(value=False))  # Each variable tracks if it's selected
-# Create Checkbuttons for each language inside the lang_frame (horizontal layout)
-for idx, (item, var) in enumerate(zip(VALID_LANGUAGES, lang_vars)):
-    cb = tk.Checkbutton(lang_frame, text=item, variable=var, font=("Helvetica", 12), command=update_views_listbox)
-    cb.grid(row=0, column=idx, sticky="w", padx=10, pady=5)  # All checkbuttons in row 0, columns 0,1,2...
-
-
-# --- dedicated views : listbow and label
-# Create Label
-views_lb = tk.Label(tab3, text="Views selector - Will restrain the export to these views", font=("Helvetica", 14, "bold"))
-views_lb.grid(row=4, column=2, sticky="nsew", padx=10, pady=5)
-# Create a Frame to contain both the Listbox and Scrollbar
-views_frame = tk.Frame(tab3)
-views_frame.grid(row=5, column=2, padx=10, pady=10)  # Grid row 5, col 2
-# Create the Listbox widget with MULTIPLE selection mode
-views_listbox = tk.Listbox(views_frame, selectmode=tk.MULTIPLE, height=10, width=150)  # Set height to show only 10 items at once
-# Get selected values
-selected_languages = [VALID_LANGUAGES[i] for i, var in enumerate(lang_vars) if var.get()]
-# Filter views by the selected languages
-if selected_languages:
-    filtered_views = [view for view in views if view['locale'] in selected_languages]
-else :
-    filtered_views = views
-# Sort the filtered views alphabetically by 'name'
-sorted_filtered_views = sorted(filtered_views, key=lambda view: view['name'].lower())
-for item in sorted_filtered_views:
-    views_listbox.insert(tk.END, item['name'])
-# Create the Scrollbar widget
-views_scrollbar = tk.Scrollbar(views_frame, orient=tk.VERTICAL, command=views_listbox.yview)
-views_scrollbar.grid(row=0, column=1, sticky="ns")  # Place the scrollbar in column 1 of the frame
-# Attach the scrollbar to the Listbox
-views_listbox.config(yscrollcommand=views_scrollbar.set)
-# Pack the Listbox inside the frame
-views_listbox.grid(row=0, column=0, sticky="nsew")  # Make the listbox fill the frame
-# Configure the frame to expand and fill the space
-views_frame.grid_rowconfigure(0, weight=1)
-views_frame.grid_columnconfigure(0, weight=1)
-
-# --- export : button, label and progressbarr
-# Create Button 
-export_bt = tk.Button(tab3, text="Export views", command=export_views)
-export_bt.grid(row=10, column=2, sticky="nsew", padx=10, pady=10)
-# Create Label 
-export_lb = tk.Label(tab3, text="Export all available views in selected language and format. If specific views are selected, only those will be exported.", font=("Helvetica", 14, "bold"))
-export_lb.grid(row=9, column=2, sticky="nsew", padx=10, pady=5)
-# ---  Progressbar
-# Create the progress bar
-export_progress_bar = ttk.Progressbar(tab3, length=300, mode='determinate')
-export_progress_bar.grid(row=11, column=2, sticky="nsew", padx=10, pady=10)
-# Create Label 
-export_progress_bar_lb = tk.Label(tab3, text="ProgressBar Statut...")
-export_progress_bar_lb.grid(row=12, column=2, sticky="nsew", padx=10, pady=5)
-
-
-root.mainloop()
\ No newline at end of file
+def conditional_headers(entry, local_filename):
+    """
+    Builds the If-None-Match / If-Modified-Since headers for a manifest entry.
+
+    No header is sent if the local file is missing or doesn't match the manifest anymore,
+    so the file is downloaded again.
+    """
+    if not entry or not os.path.exists(local_filename):
+        return {}
+    if os.path.getsize(local_filename) != entry.get('size'):
+        return {}
+    headers = {}
+    if entry.get('etag'):
+        headers['If-None-Match'] = entry['etag']
+    if entry.get('last_modified'):
+        headers['If-Modified-Since'] = entry['last_modified']
+    return headers
+
+class IncompleteDownloadError(Exception):
+    """Raised when fewer bytes than announced by the server were received."""
+
+def read_validator(partial_filename):
+    # ETag/Last-Modified of the version being downloaded in partial_filename, if known
+    try:
+        with open(partial_filename + '.json', 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+def remove_partial(partial_filename):
+    for filename in (partial_filename, partial_filename + '.json'):
+        if os.path.exists(filename):
+            os.remove(filename)
+
+# --- Compression on write : files are compressed chunk by chunk while they are downloaded
+def import_zstandard():
+    # zstandard is only needed for zstd compression : imported on first use
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("zstd compression needs zstandard. Install it with : pip install zstandard") from None
+    return zstandard
+
+def new_compressor(compression, level=None):
+    """
+    Streaming compressor : compress(chunk) returns the bytes to write so far, flush() the end of the file.
+
+    Args:
+        compression (str): 'gzip' or 'zstd'.
+        level (int, optional): Level of the codec. Its default level if None.
+    """
+    if compression == 'gzip':
+        # wbits 31 : gzip header and trailer, so the file can be read by gzip/zcat
+        return zlib.compressobj(6 if level is None else level, zlib.DEFLATED, 31)
+    if compression == 'zstd':
+        return import_zstandard().ZstdCompressor(level=3 if level is None else level).compressobj()
+    raise ValueError(f"Unknown compression {compression!r}. Choose among {', '.join(COMPRESSION_SUFFIXES)}")
+
+def open_export(path, mode='rb', **kwargs):
+    """
+    Opens an exported file, decompressed on the fly if it ends with .gz or .zst.
+
+    Example:
+        >>> with open_export(find_export(output_folder, view, 'CSV'), 'rt', encoding='utf-8') as file:
+        ...     header = file.readline()
+
+    Args:
+        path (str): The file.
+        mode (str, optional): 'rb' or 'rt'.
+        **kwargs: Text mode options (encoding, errors, newline).
+
+    Returns:
+        file object: A file object reading the uncompressed content.
+    """
+    if path.endswith(COMPRESSION_SUFFIXES['gzip']):
+        return gzip.open(path, mode, **kwargs)
+    if path.endswith(COMPRESSION_SUFFIXES['zstd']):
+        reader = import_zstandard().ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+        return io.TextIOWrapper(reader, **kwargs) if 't' in mode else reader
+    return open(path, mode, **kwargs)
+
+def download_attempt(url, partial_filename, headers, chunk_size, timeout, spool_size=0, compression=None, compression_level=None):
+    """
+    One attempt to download `url` into `partial_filename`, resuming it if it already exists.
+
+    A partial file is only resumed (HTTP Range) if the ETag/Last-Modified of its version is known.
+    The If-Range header makes the server send the whole file again if it changed in the meantime.
+    Whole files announced up to `spool_size` bytes are kept in memory instead ('content' of the result).
+
+    With `compression`, chunks are compressed as they arrive and the download starts from scratch
+    (a compressed partial file can't be resumed). gzip is requested from the server : a gzip
+    response is written as received for gzip files without `compression_level`, and decoded on
+    the fly otherwise (zstd files, or gzip files compressed again at the requested level).
+
+    Returns:
+        dict: See download_file. 'status' 304 if the file didn't change.
+
+    Raises:
+        IncompleteDownloadError: If the connection was closed before the end of the file.
+    """
+    headers = dict(headers or {})
+    offset = os.path.getsize(partial_filename) if os.path.exists(partial_filename) and not compression else 0
+    validator = read_validator(partial_filename) if offset else None
+    if validator and (validator.get('etag') or validator.get('last_modified')):
+        headers['Range'] = f"bytes={offset}-"
+        headers['If-Range'] = validator.get('etag') or validator.get('last_modified')
+    else:
+        offset = 0
+
+    # identity : Range and Content-Length must apply to the file itself, not a compressed version.
+    # Compressed files are never resumed : gzip saves network I/O
+    headers['Accept-Encoding'] = 'gzip' if compression else 'identity'
+    response = http_get(url, headers=headers, stream=True, timeout=timeout)
+    timings = request_timings(response)
+    with response:
+        if response.status_code == 304:
+            return {**timings, 'transfer': 0.0, 'size': 0}
+        if response.status_code == 416:
+            # Range not satisfiable : the partial file is not usable, start from scratch
+            remove_partial(partial_filename)
+            raise IncompleteDownloadError(f"Range not satisfiable for {url}, restarting")
+        response.raise_for_status()
+        content_length = response.headers.get('Content-Length')
+        content_encoding = response.headers.get('Content-Encoding', 'identity').lower()
+        content = None
+        if response.status_code == 206 and response.headers.get('Content-Range', '').startswith(f"bytes {offset}-"):
+            mode = 'ab'
+        else:
+            # Whole file sent (no range support, or the file changed) : start from scratch
+            offset = 0
+            mode = 'wb'
+            validator = {'etag': response.headers.get('ETag'), 'last_modified': response.headers.get('Last-Modified')}
+            if spool_size and content_length is not None and int(content_length) <= spool_size:
+                # Small file : hashed in memory, only written to disk if its content is new
+                content = bytearray()
+            elif not compression:
+                with open(partial_filename + '.json', 'w', encoding='utf-8') as file:
+                    json.dump(validator, file)
+        # gzip sent for a gzip file : the bytes are written as received, not inflated and compressed again.
+        # Not with an explicit level : the server's level is unknown
+        passthrough = compression == 'gzip' and compression_level is None and content_encoding == 'gzip'
+        if passthrough:
+            chunks = response.raw.stream(chunk_size, decode_content=False)
+        else:
+            chunks = response.iter_content(chunk_size)
+        compressor = new_compressor(compression, compression_level) if compression and not passthrough else None
+        # Content-Length is the size of the body as sent : only comparable to the bytes received as is
+        expected_size = offset + int(content_length) if content_length is not None and (passthrough or content_encoding == 'identity') else None
+
+        # Hash the bytes already downloaded, then stream the rest
+        sha256 = hashlib.sha256()
+        if offset:
+            with open(partial_filename, 'rb') as file:
+                for chunk in iter(lambda: file.read(chunk_size), b''):
+                    sha256.update(chunk)
+        size = offset
+        received = offset
+        transfer_start = time.perf_counter()
+        file = open(partial_filename, mode) if content is None else None
+        write = file.write if file else content.extend
+        try:
+            for chunk in chunks:
+                received += len(chunk)
+                if compressor:
+                    chunk = compressor.compress(chunk)
+                write(chunk)
+                sha256.update(chunk)
+                size += len(chunk)
+            if compressor:
+                chunk = compressor.flush()
+                write(chunk)
+                sha256.update(chunk)
+                size += len(chunk)
+        finally:
+            if file:
+                file.close()
+        timings['transfer'] = time.perf_counter() - transfer_start
+
+    if expected_size is not None and received != expected_size:
+        raise IncompleteDownloadError(f"Received {received} of {expected_size} bytes for {url}")
+    return {
+        **timings,
+        'status': 200,
+        'etag': validator.get('etag'),
+        'last_modified': validator.get('last_modified'),
+        'size': size,
+        'sha256': sha256.hexdigest(),
+        'content': content,
+    }
+
+def download_file(url, local_filename, headers=None, chunk_size=DOWNLOAD_CHUNK_SIZE, timeout=DOWNLOAD_TIMEOUT, retries=DOWNLOAD_RETRIES, blobs_folder=None,
+                  compression=None, compression_level=None):
+    """
+    Downloads a single file, safely.
+
+    The file is streamed by chunks into `local_filename` + PARTIAL_SUFFIX, then renamed to
+    `local_filename` once complete : an existing file is never replaced by a truncated one.
+    Requests go through the shared session (see http_get). Transfers interrupted midway are
+    retried, resuming where the download stopped. The partial file is kept after the last attempt,
+    so the next run resumes it.
+
+    With `blobs_folder`, the content is stored once in the content-addressed store (see store_blob)
+    and `local_filename` is a hardlink to it. Files up to DEDUP_SPOOL_SIZE are streamed in memory,
+    so a duplicate is detected before anything is written to disk.
+
+    With `compression`, the file is compressed while it is downloaded (see download_attempt) :
+    'size' and 'sha256' are then those of the compressed file.
+
+    Args:
+        url (str): The URL of the file.
+        local_filename (str): Where to save the file.
+        headers (dict, optional): Extra request headers (e.g. conditional headers).
+        chunk_size (int, optional): Bytes read/written at a time.
+        timeout (int, optional): Seconds without data before the attempt fails.
+        retries (int, optional): Maximum number of attempts for interrupted transfers.
+        blobs_folder (str, optional): Content-addressed store to deduplicate the file into.
+        compression (str, optional): 'gzip' or 'zstd'. Saved as downloaded if None.
+        compression_level (int, optional): Level of the codec. Its default level if None.
+
+    Returns:
+        dict: 'status' (200, or 304 if the file didn't change and wasn't downloaded),
+              'etag', 'last_modified', 'size' and 'sha256' of the downloaded file,
+              'duplicate' (True if the content was already in `blobs_folder`),
+              and the telemetry of the last attempt : 'retries', 'connect', 'ttfb', 'transfer'.
+    """
+    from requests.exceptions import ChunkedEncodingError, ConnectionError, Timeout
+    partial_filename = local_filename + PARTIAL_SUFFIX
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            result = download_attempt(url, partial_filename, headers, chunk_size, timeout, DEDUP_SPOOL_SIZE if blobs_folder else 0,
+                                      compression, compression_level)
+            break
+        except (IncompleteDownloadError, ChunkedEncodingError, ConnectionError, Timeout) as e:
+            if attempt >= retries:
+                raise
+            delay = backoff_delay(attempt)
+            logging.error(f"Download of {url} interrupted: {e}. Retrying in {delay:.1f} seconds...")
+        time.sleep(delay)
+
+    result['duplicate'] = False
+    if result['status'] == 200 and blobs_folder:
+        result['duplicate'] = store_blob(blobs_folder, result['sha256'], local_filename, partial_filename, result['content'])
+    elif result['status'] == 200:
+        # Complete : atomically replace the previous version of the file
+        os.replace(partial_filename, local_filename)
+        remove_partial(partial_filename)
+    result.pop('content', None)
+    result['retries'] += attempt - 1
+    return result
+
+# --- Content-addressed store : each distinct content is stored once, exported files are hardlinks to it
+blob_lock = threading.Lock()
+
+def blob_path(blobs_folder, sha256):
+    # blobs/<2 first hex digits>/<sha256> : at most 256 sub-folders, files spread evenly
+    return os.path.join(blobs_folder, sha256[:2], sha256)
+
+def dedup_blobs_folder(output_folder):
+    """
+    The content-addressed store of an Output folder, if its file system supports hardlinks.
+
+    Without hardlinks, exported files would be copies of the blobs : nothing would be saved, and
+    prune_blobs (which counts links) would delete every blob after each export.
+
+    Returns:
+        str: The blobs folder. None (deduplication disabled, with a logged warning) without hardlinks.
+    """
+    blobs_folder = os.path.join(output_folder, BLOBS_FOLDER)
+    os.makedirs(blobs_folder, exist_ok=True)
+    probe = os.path.join(blobs_folder, f"link-probe.{os.getpid()}.{threading.get_ident()}.tmp")
+    link = os.path.join(output_folder, f"link-probe.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(probe, 'wb'):
+            pass
+        os.link(probe, link)
+    except OSError as e:
+        logging.error(f"No hardlinks in {output_folder} ({e}) : deduplication is disabled, files are exported as usual.")
+        blobs_folder = None
+    finally:
+        for path in (probe, link):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    if blobs_folder is None:
+        try:
+            os.rmdir(os.path.join(output_folder, BLOBS_FOLDER))
+        except OSError:
+            pass  # Not empty : blobs of a file system that had hardlinks
+    return blobs_folder
+
+def store_blob(blobs_folder, sha256, local_filename, partial_filename, content=None):
+    """
+    Stores a downloaded file in the content-addressed store, and links `local_filename` to it.
+
+    The content is either in `partial_filename` (moved into the store) or in memory (`content`).
+    If the store already has this content, nothing is written : the partial file is dropped
+    and `local_filename` is linked to the existing blob.
+
+    Returns:
+        bool: True if the content was already stored (duplicate).
+    """
+    blob = blob_path(blobs_folder, sha256)
+    if os.path.exists(blob) and reuse_blob(blob, local_filename):
+        remove_partial(partial_filename)
+        return True
+    os.makedirs(os.path.dirname(blob), exist_ok=True)
+    if content is not None:
+        tmp_path = f"{blob}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as file:
+            file.write(content)
+    else:
+        tmp_path = partial_filename
+    # Another worker may have stored the same content in the meantime
+    with blob_lock:
+        duplicate = os.path.exists(blob) and reuse_blob(blob, local_filename)
+        if not duplicate:
+            os.replace(tmp_path, blob)
+    if duplicate and content is not None:
+        os.remove(tmp_path)
+    remove_partial(partial_filename)
+    if not duplicate:
+        link_blob(blob, local_filename)
+    return duplicate
+
+def reuse_blob(blob, local_filename):
+    # Links local_filename to an already stored blob. False if a concurrent prune_blobs removed it
+    # in the meantime : it must be stored again. Touched first, so that prune_blobs spares it
+    try:
+        os.utime(blob)
+        link_blob(blob, local_filename)
+        return True
+    except FileNotFoundError:
+        return False
+
+def link_blob(blob, local_filename):
+    # Atomically replace local_filename by a hardlink to the blob
+    if os.path.exists(local_filename) and os.path.samefile(blob, local_filename):
+        return
+    tmp_path = f"{local_filename}.{threading.get_ident()}.link"
+    try:
+        os.link(blob, tmp_path)
+    except OSError:
+        # No more hardlinks possible (e.g. link count limit) : copy instead. File systems without
+        # hardlinks at all don't deduplicate (see dedup_blobs_folder)
+        shutil.copyfile(blob, tmp_path)
+    os.replace(tmp_path, local_filename)
+
+def prune_blobs(blobs_folder):
+    """
+    Removes the blobs no exported file links to anymore (files replaced by a new version,
+    or removed with their view), and temp files left by interrupted runs.
+
+    Blobs and temp files modified less than BLOBS_PRUNE_GRACE ago are kept : another run on the
+    same Output folder may be storing them, between the write of the blob and its link.
+
+    Returns:
+        int: The number of removed blobs.
+    """
+    removed = 0
+    if not os.path.isdir(blobs_folder):
+        return removed
+    limit = time.time() - BLOBS_PRUNE_GRACE
+    for folder in os.scandir(blobs_folder):
+        if not folder.is_dir():
+            continue
+        for entry in os.scandir(folder.path):
+            try:
+                # os.stat : DirEntry.stat() has no link count on Windows
+                stat = os.stat(entry.path)
+                if (entry.name.endswith('.tmp') or stat.st_nlink <= 1) and stat.st_mtime < limit:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError as e:
+                logging.error(f"Could not remove {entry.path}: {e}")
+    return removed
+
+def run_downloads(tasks, max_workers=MAX_WORKERS, max_per_host=None, on_progress=None, manifest=None, output_folder=None, control=None, blobs_folder=None, history=None):
+    """
+    Downloads all tasks with a bounded pool of workers.
+
+    At most `max_workers` files are downloaded at the same time, and at most
+    `max_per_host` of them target the same host. Errors are logged and do not
+    stop the other downloads.
+
+    Args:
+        tasks (list of dict): Tasks, as returned by build_export_tasks or plan_export (run in this order).
+        max_workers (int, optional): Number of parallel downloads.
+        max_per_host (int, optional): Number of parallel downloads per host. See set_max_connections_per_host by default.
+        on_progress (callable, optional): Called with the DownloadProgress after each file,
+            from the calling thread.
+        manifest (dict, optional): Incremental sync manifest (see load_manifest). When given,
+            conditional requests are sent, unchanged files are skipped and the manifest is updated.
+        output_folder (str, optional): Folder manifest paths are relative to. Required with `manifest`.
+        control (ExportControl, optional): To pause or cancel the run from another thread.
+        blobs_folder (str, optional): Content-addressed store. When given, identical files are stored once.
+        history (dict, optional): Download history (see load_history), updated with the result of every file.
+
+    Returns:
+        DownloadProgress: The final counters of the run. Cancelled files are not counted.
+    """
+    max_per_host = max_per_host or max_connections_per_host
+    progress = DownloadProgress(len(tasks), sum(task.get('estimated_seconds', 0.0) for task in tasks), max(1, min(max_workers, max_per_host)))
+    control = control or ExportControl()
+    ensure_pool_size(min(max_workers, max_per_host))
+    state_lock = threading.Lock()  # Manifest and history
+    # One semaphore per host to limit the number of simultaneous connections
+    host_limits = {}
+    for task in tasks:
+        host = urlparse(task['url']).netloc
+        if host not in host_limits:
+            host_limits[host] = threading.BoundedSemaphore(max_per_host)
+
+    def worker(task):
+        # Wait while paused, skip once cancelled
+        if not control.wait():
+            return
+        key = manifest_key(task['id'], task['exporter'])
+        headers = {}
+        if manifest is not None:
+            headers = conditional_headers(manifest.get(key), task['path'])
+        telemetry = {'kind': 'download', 'view_id': task['id'], 'exporter': task['exporter'], 'url': task['url']}
+        with host_limits[urlparse(task['url']).netloc]:
+            start = time.perf_counter()
+            try:
+                result = download_file(task['url'], task['path'], headers, blobs_folder=blobs_folder,
+                                       compression=task.get('compression'), compression_level=task.get('compression_level'))
+            except Exception as e:
+                # Log the error, continue with the next file
+                logging.error(f"Error downloading {task['url']}: {e}")
+                response = getattr(e, 'response', None)
+                status = getattr(response, 'status_code', None)
+                record_request(**telemetry, status=status, retries=getattr(response, 'retries', None),
+                               total=time.perf_counter() - start, error=f"{type(e).__name__}: {e}")
+                if history is not None:
+                    with state_lock:
+                        update_history(history, key, status)
+                progress.record(False, planned=task.get('estimated_seconds', 0.0), task={**task, 'status': status})
+                return
+        duration = time.perf_counter() - start
+        record_request(**telemetry, status=result['status'], bytes=result['size'], retries=result['retries'], connect=result['connect'],
+                       ttfb=result['ttfb'], transfer=result['transfer'], total=duration)
+        if history is not None:
+            with state_lock:
+                update_history(history, key, result['status'], result['size'], duration)
+        if result['status'] == 304:
+            progress.record(True, unchanged=True, planned=task.get('estimated_seconds', 0.0))
+            return
+        if manifest is not None:
+            with state_lock:
+                manifest[key] = {
+                    'path': os.path.relpath(task['path'], output_folder),
+                    'etag': result['etag'],
+                    'last_modified': result['last_modified'],
+                    'size': result['size'],
+                    'sha256': result['sha256'],
+                    'timestamp': datetime.now().isoformat(timespec='seconds'),
+                }
+        progress.record(True, result['size'], duplicate=result['duplicate'], planned=task.get('estimated_seconds', 0.0))
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = [executor.submit(worker, task) for task in tasks]
+        try:
+            for future in as_completed(futures):
+                future.result()
+                if on_progress:
+                    on_progress(progress)
+        except BaseException:
+            # e.g. Ctrl+C : don't wait for all the remaining files
+            control.cancel()
+            raise
+    return progress
+
+def prune_removed_views(current_views, output_folder):
+    # Incremental sync : removes the files and manifest entries of views that disappeared from the API
+    manifest = load_manifest(output_folder)
+    if prune_manifest(manifest, current_views, output_folder):
+        save_manifest(manifest, output_folder)
+
+def prune_manifest(manifest, current_views, output_folder):
+    """
+    Removes the files of views that disappeared from the API, and their manifest entries.
+
+    A file is only deleted when no remaining entry points to it (views with the same
+    name share the same file).
+
+    Returns:
+        int: The number of pruned manifest entries.
+    """
+    current_ids = {str(view.id) for view in current_views}
+    removed = {key: entry for key, entry in manifest.items() if key.split('/')[0] not in current_ids}
+    for key in removed:
+        del manifest[key]
+    kept_paths = {entry['path'] for entry in manifest.values()}
+    for entry in removed.values():
+        if entry['path'] in kept_paths:
+            continue
+        local_filename = os.path.join(output_folder, entry['path'])
+        try:
+            if os.path.exists(local_filename):
+                os.remove(local_filename)
+        except OSError as e:
+            logging.error(f"Could not remove {local_filename}: {e}")
+    return len(removed)
+
+# --- Export planning : skip the files known to fail, largest first, estimated size and duration
+def load_history(output_folder):
+    """
+    Loads the download history of an output folder.
+
+    The history records, per (view id, exporter), the size and duration of the last download
+    ('bytes', 'seconds'), of the last check of an unchanged file ('check_seconds'), and the
+    failures in a row ('failures', 'status', 'failed_at').
+
+    Returns:
+        dict: The history entries, keyed by manifest_key(). Empty if there is no history yet.
+    """
+    return load_state_file(os.path.join(output_folder, HISTORY_FILENAME), 'history')
+
+def save_history(history, output_folder):
+    # Only the changes of this run are saved (see save_state_file)
+    save_state_file(history, os.path.join(output_folder, HISTORY_FILENAME), separators=(',', ':'))
+
+def update_history(history, key, status, nbytes=None, seconds=None):
+    """
+    Records the result of a download in the history.
+
+    Only errors answered by the server count as failures, and not the transient ones
+    (RETRY_STATUS_CODES) : a network or server outage doesn't get views skipped.
+    """
+    entry = history.setdefault(key, {})
+    if status == 200:
+        entry.update(bytes=nbytes, seconds=round(seconds, 3), failures=0)
+    elif status == 304:
+        entry.update(check_seconds=round(seconds, 3), failures=0)
+    elif status is not None and status not in RETRY_STATUS_CODES:
+        entry.update(failures=entry.get('failures', 0) + 1, status=status, failed_at=datetime.now().isoformat(timespec='seconds'))
+
+def known_failure(entry, now=None):
+    # True if the planner should skip this file : it failed in the last runs, not long ago
+    if not entry or entry.get('failures', 0) < PLAN_SKIP_FAILURES:
+        return False
+    try:
+        failed_at = datetime.fromisoformat(entry['failed_at'])
+    except (KeyError, TypeError, ValueError):
+        return False
+    return ((now or datetime.now()) - failed_at).total_seconds() < PLAN_RETRY_FAILED_AFTER
+
+class ExportPlan:
+    """
+    The files of an export, as planned by plan_export.
+
+    Attributes:
+        tasks (list of dict): Tasks to download, most expensive first, with their 'estimated_seconds',
+            'estimated_bytes' and 'estimated_from_history'.
+        skipped (list of dict): Tasks not downloaded because they failed in the last runs.
+        estimated_bytes (int): Estimated bytes to download. None without any history.
+        estimated_seconds (float): Estimated duration of the export, with its parallel downloads.
+        from_history (int): Number of tasks estimated from their own history. The others are
+            estimated from the median of their format (or PLAN_DEFAULT_SECONDS without any history).
+    """
+    def __init__(self, tasks, skipped, estimated_bytes, estimated_seconds, from_history):
+        self.tasks = tasks
+        self.skipped = skipped
+        self.estimated_bytes = estimated_bytes
+        self.estimated_seconds = estimated_seconds
+        self.from_history = from_history
+
+    def describe(self):
+        # One line summary, e.g. for a confirmation before a long export
+        skipped_text = f", {len(self.skipped)} skipped (failed in previous runs)" if self.skipped else ""
+        size_text = f"about {format_size(self.estimated_bytes)}" if self.estimated_bytes is not None else "unknown size"
+        return f"{len(self.tasks)} file(s) to export{skipped_text}, {size_text} in about {format_duration(self.estimated_seconds)}"
+
+def plan_export(tasks, history, workers=MAX_WORKERS, manifest=None, retry_failed=False):
+    """
+    Plans an export from the history of the previous runs.
+
+    - Files that failed PLAN_SKIP_FAILURES runs in a row (e.g. a format the API can't produce
+      for a view) are skipped, until PLAN_RETRY_FAILED_AFTER has passed or `retry_failed` is set.
+    - Files are ordered by estimated duration, largest first : the long downloads don't end up
+      alone at the end of the run while the other workers are idle.
+    - The duration is estimated by scheduling the files on `workers` parallel downloads.
+
+    Args:
+        tasks (list of dict): Tasks, as returned by build_export_tasks.
+        history (dict): Download history (see load_history).
+        workers (int, optional): Number of parallel downloads.
+        manifest (dict, optional): Incremental sync manifest. Files in it are estimated as
+            unchanged (a conditional request, nothing downloaded).
+        retry_failed (bool, optional): Don't skip the files that failed in previous runs.
+
+    Returns:
+        ExportPlan: The planned tasks and estimates.
+    """
+    # Median size and duration per format, for files without history
+    samples = {}
+    for key, entry in history.items():
+        if entry.get('seconds') is not None:
+            samples.setdefault(key.rsplit('/', 1)[-1], []).append((entry['seconds'], entry.get('bytes') or 0))
+    all_samples = [sample for values in samples.values() for sample in values]
+
+    def median(values, index):
+        return percentile([value[index] for value in values], 50)
+
+    defaults = {exporter: (median(values, 0), median(values, 1)) for exporter, values in samples.items()}
+    default = (median(all_samples, 0), median(all_samples, 1)) if all_samples else (PLAN_DEFAULT_SECONDS, None)
+
+    now = datetime.now()
+    planned, skipped = [], []
+    for task in tasks:
+        key = manifest_key(task['id'], task['exporter'])
+        entry = history.get(key)
+        if not retry_failed and known_failure(entry, now):
+            skipped.append(task)
+            continue
+        known = True
+        if manifest is not None and key in manifest and entry and entry.get('check_seconds') is not None:
+            seconds, nbytes = entry['check_seconds'], 0
+        elif entry and entry.get('seconds') is not None:
+            seconds, nbytes = entry['seconds'], entry.get('bytes') or 0
+        else:
+            seconds, nbytes = defaults.get(task['exporter'], default)
+            known = False
+        planned.append({**task, 'estimated_seconds': seconds, 'estimated_bytes': nbytes, 'estimated_from_history': known})
+    planned.sort(key=lambda task: task['estimated_seconds'], reverse=True)
+    return ExportPlan(planned, skipped, estimated_size(planned), estimated_duration(planned, workers),
+                      sum(task['estimated_from_history'] for task in planned))
+
+def estimated_duration(planned, workers):
+    # Planned tasks, in order, on the first free worker : the end of the last worker is the duration
+    workers_end = [0.0] * max(1, min(workers, len(planned)))
+    for task in planned:
+        heapq.heapreplace(workers_end, workers_end[0] + task['estimated_seconds'])
+    return max(workers_end)
+
+def estimated_size(planned):
+    # Sum of the estimated bytes of planned tasks. None without any history
+    sizes = [task['estimated_bytes'] for task in planned if task['estimated_bytes'] is not None]
+    return sum(sizes) if sizes or not planned else None
+
+def plan_views_export(views_to_export, exporters, output_folder, max_workers=MAX_WORKERS, incremental=False, retry_failed=False, backend=EXPORT_BACKEND,
+                      compression=COMPRESSION, compression_level=COMPRESSION_LEVEL, processes=1):
+    """
+    Plans the export of views in the given formats (see plan_export), without downloading anything.
+    `processes` : number of shards run at the same time, each with `max_workers` (see export_sharded).
+
+    Returns:
+        ExportPlan: The planned tasks and estimates.
+    """
+    tasks = build_export_tasks(views_to_export, exporters, output_folder, compression, compression_level)
+    manifest = load_manifest(output_folder) if incremental else None
+    return plan_export(tasks, load_history(output_folder), parallel_downloads(max_workers, backend) * processes, manifest, retry_failed)
+
+def parallel_downloads(max_workers, backend=EXPORT_BACKEND):
+    # Files downloaded at the same time : the threads backend also limits the connections per host
+    return max_workers if backend == 'async' else min(max_workers, max_connections_per_host)
+
+def export_views(views_to_export, exporters, output_folder, max_workers=MAX_WORKERS, incremental=False, on_progress=None, control=None, deduplicate=False, retry_failed=False, plan=None, backend=EXPORT_BACKEND,
+                 compression=COMPRESSION, compression_level=COMPRESSION_LEVEL) :
+    """
+    Exports views in the given formats, in a sub-folder per format of `output_folder`.
+
+    Args:
+        views_to_export (list of View): Views to export.
+        exporters (list of str): Formats to export, from VALID_EXPORTERS.
+        output_folder (str): The Output folder.
+        max_workers (int, optional): Number of parallel downloads.
+        incremental (bool, optional): Only download files that changed since the last export.
+        on_progress (callable, optional): Called with the DownloadProgress after each file.
+        control (ExportControl, optional): To pause or cancel the export from another thread.
+        deduplicate (bool, optional): Store identical files once (Output/blobs), the format
+            folders get hardlinks to them.
+        retry_failed (bool, optional): Also request the files that failed in previous runs.
+        plan (ExportPlan, optional): The plan to run, if already made (see plan_views_export).
+        backend (str, optional): 'threads', or 'async' to run async_export in a new event loop
+            (max_workers is then the number of simultaneous requests).
+        compression (str, optional): 'gzip' or 'zstd' to compress the CSV, JSON, XML and HTML files
+            while they are downloaded (.gz/.zst, read them with open_export).
+        compression_level (int, optional): Level of the codec. Its default level if None.
+
+    Returns:
+        DownloadProgress: The final counters of the export.
+    """
+    if backend == 'async':
+        import asyncio
+        return asyncio.run(async_export(views_to_export, exporters, output_folder=output_folder, concurrency=max_workers, incremental=incremental,
+                                        deduplicate=deduplicate, retry_failed=retry_failed, on_progress=on_progress, control=control, plan=plan,
+                                        compression=compression, compression_level=compression_level))
+    # --- Plan : skip files known to fail, largest first
+    history = load_history(output_folder)
+    manifest = load_manifest(output_folder) if incremental else None
+    if plan is None:
+        tasks = build_export_tasks(views_to_export, exporters, output_folder, compression, compression_level)
+        plan = plan_export(tasks, history, parallel_downloads(max_workers), manifest, retry_failed)
+    # --- Download all files, several at a time. Incremental : only changed files
+    blobs_folder = dedup_blobs_folder(output_folder) if deduplicate else None
+    try:
+        progress = run_downloads(plan.tasks, max_workers=max_workers, on_progress=on_progress, manifest=manifest, output_folder=output_folder,
+                                 control=control, blobs_folder=blobs_folder, history=history)
+        progress.skipped = len(plan.skipped)
+        return progress
+    finally:
+        save_history(history, output_folder)
+        if manifest is not None:
+            save_manifest(manifest, output_folder)
+        if blobs_folder:
+            prune_blobs(blobs_folder)
+
+def export_all_views(views, output_folder, max_workers=MAX_WORKERS, incremental=False, on_progress=None, control=None, deduplicate=False, retry_failed=False, plan=None, backend=EXPORT_BACKEND,
+                     compression=COMPRESSION, compression_level=COMPRESSION_LEVEL) :
+    # --- Incremental sync : first drop views that disappeared from the API
+    if incremental:
+        prune_removed_views(views, output_folder)
+    # --- Export every view in every format
+    return export_views(views, VALID_EXPORTERS, output_folder, max_workers, incremental, on_progress, control, deduplicate, retry_failed, plan, backend,
+                        compression, compression_level)
+
+# ===============================================================
+# Sharded export : the files split by a stable hash, one process (or machine) per shard
+# ===============================================================
+# Each shard writes its manifest, history and counters in Output/shards/<index>-of-<count>, so shards
+# never write the same state file. Exported files and blobs are replaced atomically. Once all shards
+# are done, finish_sharded_export() merges their state and retries their failed files.
+SHARD_COUNTERS = ['total', 'done', 'failed', 'unchanged', 'bytes', 'deduplicated', 'skipped']  # DownloadProgress counters saved by each shard
+
+def shard_of(key, count):
+    """
+    The shard of a manifest key ("<view id>/<exporter>"), from 0 to count - 1.
+
+    From the sha1 of the key : the same in every process, run and machine (hash() of a str is not).
+    """
+    return int.from_bytes(hashlib.sha1(key.encode('utf-8')).digest()[:8], 'big') % count
+
+def shard_folder(output_folder, index, count):
+    # Output/shards/<index>-of-<count>
+    return os.path.join(output_folder, SHARDS_FOLDER, f"{index}-of-{count}")
+
+def shard_plan(plan, index, count, workers=MAX_WORKERS):
+    """
+    The part of an export plan in shard `index` of `count` (see shard_of). Tasks keep their order.
+
+    Returns:
+        ExportPlan: The tasks of the shard, with their estimates on `workers` parallel downloads.
+    """
+    def in_shard(task):
+        return shard_of(manifest_key(task['id'], task['exporter']), count) == index
+
+    tasks = [task for task in plan.tasks if in_shard(task)]
+    skipped = [task for task in plan.skipped if in_shard(task)]
+    return ExportPlan(tasks, skipped, estimated_size(tasks), estimated_duration(tasks, workers),
+                      sum(task.get('estimated_from_history', False) for task in tasks))
+
+def export_shard(plan, output_folder, index, count, max_workers=MAX_WORKERS, incremental=False, deduplicate=False, backend=EXPORT_BACKEND,
+                 on_progress=None, control=None):
+    """
+    Runs shard `index` of `count` of an export : the tasks of `plan` in this shard.
+
+    Shards can run at the same time, in other processes or on other machines sharing the Output
+    folder. A shard starts from the manifest and history of the Output folder, and writes its own
+    in Output/shards/<index>-of-<count> with its counters and failed files (see merge_shards).
+    Blobs are not pruned : other shards may be linking them.
+
+    Args:
+        plan (ExportPlan): The plan of the whole export (see plan_views_export), or of this shard.
+        output_folder (str): The Output folder.
+        index (int): The shard to run, from 0 to count - 1.
+        count (int): Number of shards.
+        max_workers, incremental, deduplicate, backend, on_progress, control: See export_views.
+
+    Returns:
+        DownloadProgress: The final counters of the shard.
+    """
+    plan = shard_plan(plan, index, count, parallel_downloads(max_workers, backend))
+    folder = shard_folder(output_folder, index, count)
+    os.makedirs(folder, exist_ok=True)
+    keys = {manifest_key(task['id'], task['exporter']) for task in plan.tasks + plan.skipped}
+    # State of the Output folder, then of a run of this shard not merged yet
+    history = {key: entry for key, entry in load_history(output_folder).items() if key in keys}
+    history.update(load_history(folder))
+    manifest = None
+    if incremental:
+        manifest = {key: entry for key, entry in load_manifest(output_folder).items() if key in keys}
+        manifest.update(load_manifest(folder))
+    blobs_folder = dedup_blobs_folder(output_folder) if deduplicate else None
+    try:
+        if backend == 'async':
+            import asyncio
+
+            async def run():
+                async with open_async_session(max_workers) as session:
+                    return await async_run_downloads(session, plan.tasks, max_workers, on_progress, manifest, output_folder, control, blobs_folder, history)
+            progress = asyncio.run(run())
+        else:
+            progress = run_downloads(plan.tasks, max_workers=max_workers, on_progress=on_progress, manifest=manifest, output_folder=output_folder,
+                                     control=control, blobs_folder=blobs_folder, history=history)
+        progress.skipped = len(plan.skipped)
+    finally:
+        save_history(history, folder)
+        if manifest is not None:
+            save_manifest(manifest, folder)
+    state = {
+        'index': index,
+        'count': count,
+        'incremental': incremental,
+        'deduplicate': blobs_folder is not None,
+        'finished': datetime.now().isoformat(timespec='seconds'),
+        **{counter: getattr(progress, counter) for counter in SHARD_COUNTERS},
+        'failed_tasks': progress.failed_tasks,
+    }
+    state_path = os.path.join(folder, SHARD_STATE_FILENAME)
+    with open(state_path + '.tmp', 'w', encoding='utf-8') as file:
+        json.dump(state, file)
+    os.replace(state_path + '.tmp', state_path)
+    return progress
+
+def merge_shards(output_folder):
+    """
+    Merges the state of the shards into the Output folder, then removes the shard folders.
+    Only call it once all shards are done.
+
+    Manifest and history entries of the shards replace those of the Output folder (a key
+    belongs to one shard only). A shard that didn't finish has its manifest and history merged,
+    but its counters and failed files are unknown.
+
+    Returns:
+        dict: The summed counters of the shards (see SHARD_COUNTERS), 'shards' (number of merged
+              shards), 'failed_tasks', and 'incremental'/'deduplicate' (True if a shard ran with it).
+    """
+    merged = {'shards': 0, **dict.fromkeys(SHARD_COUNTERS, 0), 'failed_tasks': [], 'incremental': False, 'deduplicate': False}
+    folders = sorted(glob.glob(os.path.join(output_folder, SHARDS_FOLDER, '*-of-*')))
+    if not folders:
+        return merged
+    history = load_history(output_folder)
+    manifest = load_manifest(output_folder)
+    manifest_changed = False
+    for folder in folders:
+        try:
+            with open(os.path.join(folder, SHARD_STATE_FILENAME), 'r', encoding='utf-8') as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            logging.error(f"Shard {folder} did not finish : its manifest and history are merged, not its counters and failed files.")
+            state = {}
+        history.update(load_history(folder))
+        shard_manifest = load_manifest(folder)
+        manifest.update(shard_manifest)
+        manifest_changed = manifest_changed or bool(shard_manifest)
+        for counter in SHARD_COUNTERS:
+            merged[counter] += state.get(counter, 0)
+        merged['failed_tasks'] += state.get('failed_tasks', [])
+        merged['incremental'] = merged['incremental'] or state.get('incremental', False)
+        merged['deduplicate'] = merged['deduplicate'] or state.get('deduplicate', False)
+        merged['shards'] += 1
+    save_history(history, output_folder)
+    if manifest_changed:
+        save_manifest(manifest, output_folder)
+    for folder in folders:
+        shutil.rmtree(folder, ignore_errors=True)
+    try:
+        os.rmdir(os.path.join(output_folder, SHARDS_FOLDER))
+    except OSError:
+        pass  # Not empty : a shard folder could not be removed
+    return merged
+
+def finish_sharded_export(output_folder, max_workers=MAX_WORKERS, backend=EXPORT_BACKEND, retry=True):
+    """
+    Ends a sharded export once all its shards are done : merges their state (see merge_shards),
+    downloads again the files that failed in the shards (once, in this process), and prunes the blobs.
+
+    Only transient failures (no answer, or a RETRY_STATUS_CODES status) are retried : a file the
+    API refused (e.g. 404) would fail again, and count twice in the history for the same run.
+
+    Returns:
+        DownloadProgress: The counters of the whole export. Retried files count once, with their last result.
+    """
+    merged = merge_shards(output_folder)
+    progress = DownloadProgress(merged['total'])
+    for counter in SHARD_COUNTERS[1:]:
+        setattr(progress, counter, merged[counter])
+    progress.failed_tasks = merged['failed_tasks']
+    transient, refused = [], []
+    for task in merged['failed_tasks']:
+        (transient if task.get('status') is None or task['status'] in RETRY_STATUS_CODES else refused).append(task)
+    if retry and transient:
+        plan = plan_export(transient, load_history(output_folder), parallel_downloads(max_workers, backend), retry_failed=True)
+        retried = export_views([], [], output_folder, max_workers, merged['incremental'], deduplicate=merged['deduplicate'], plan=plan, backend=backend)
+        progress.failed += retried.failed - len(transient)
+        progress.failed_tasks = refused + retried.failed_tasks
+        progress.done += retried.done
+        progress.unchanged += retried.unchanged
+        progress.bytes += retried.bytes
+        progress.deduplicated += retried.deduplicated
+    elif merged['deduplicate']:
+        prune_blobs(os.path.join(output_folder, BLOBS_FOLDER))
+    return progress
+
+def run_shard_process(plan, output_folder, index, count, max_workers, incremental, deduplicate, backend, rate_limit, max_per_host, report):
+    # Entry point of a shard process (see export_sharded) : error log, limits and run report like the parent
+    global http_session
+    # A forked process inherits the kept-alive connections of the parent : they must not be shared
+    http_session = None
+    init_output_folder(output_folder)
+    set_rate_limit(rate_limit)
+    set_max_connections_per_host(max_per_host)
+    shard_report = start_run_report() if report else None
+    try:
+        export_shard(plan, output_folder, index, count, max_workers, incremental, deduplicate, backend)
+    finally:
+        if shard_report:
+            shard_report.write(output_folder, f"-shard-{index}-of-{count}")
+
+def export_sharded(views_to_export, exporters, output_folder, processes=None, max_workers=MAX_WORKERS, incremental=False, deduplicate=False,
+                   retry_failed=False, plan=None, backend=EXPORT_BACKEND, compression=COMPRESSION, compression_level=COMPRESSION_LEVEL):
+    """
+    Exports views with `processes` shards run at the same time, one process each, then merges them
+    (see finish_sharded_export). Hashing, compression and file handling then use several cores.
+
+    Each process runs `max_workers` downloads, and gets its share of the rate limit. To spread an
+    export over several machines sharing the Output folder, run export_shard on each machine, then
+    finish_sharded_export on one of them.
+
+    Args:
+        processes (int, optional): Number of shards/processes. The number of cores by default.
+        Others : see export_views.
+
+    Returns:
+        DownloadProgress: The counters of the whole export.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    processes = processes or os.cpu_count() or 1
+    if plan is None:
+        plan = plan_views_export(views_to_export, exporters, output_folder, max_workers, incremental, retry_failed, backend,
+                                 compression, compression_level, processes)
+    rate_limit = rate_limiter.rate / processes if rate_limiter.rate else None
+    workers = parallel_downloads(max_workers, backend)
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = {
+            executor.submit(run_shard_process, shard_plan(plan, index, processes, workers), output_folder, index, processes, max_workers,
+                            incremental, deduplicate, backend, rate_limit, max_connections_per_host, run_report is not None): index
+            for index in range(processes)
+        }
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                # What the shard saved is still merged, its files are downloaded by the next export
+                logging.error(f"Shard {futures[future]} of {processes} failed: {type(e).__name__}: {e}")
+    return finish_sharded_export(output_folder, max_workers, backend)
+
+# ===============================================================
+# Columnar store : CSV/JSON exports converted to Parquet/Arrow, partitioned by locale and view id
+# ===============================================================
+def import_pyarrow():
+    # pyarrow is only needed by the columnar store : imported on first use
+    try:
+        import pyarrow
+        import pyarrow.csv
+        import pyarrow.dataset
+        import pyarrow.fs
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("The columnar store needs pyarrow. Install it with : pip install pyarrow") from None
+    return pyarrow
+
+def columnar_path(output_folder, view, file_format=COLUMNAR_FORMAT):
+    # Output/columnar/locale=<locale>/view_id=<id>/data.<format> (hive partitioning)
+    return os.path.join(output_folder, COLUMNAR_FOLDER, f"locale={view.locale}", f"view_id={view.id}", f"data.{file_format}")
+
+def read_csv_table(path):
+    # Typed table from an exported CSV (pyarrow decompresses .gz/.zst). The delimiter is detected from the first lines
+    pa = import_pyarrow()
+    with open_export(path, 'rt', encoding='utf-8-sig', errors='replace', newline='') as file:
+        sample = file.read(64 * 1024)
+    try:
+        delimiter = csv.Sniffer().sniff(sample, delimiters=',;\t|').delimiter
+    except csv.Error:
+        delimiter = ','
+    return pa.csv.read_csv(path, parse_options=pa.csv.ParseOptions(delimiter=delimiter))
+
+def read_json_table(path):
+    # Typed table from an exported JSON. Nested objects become "parent.child" columns
+    pa = import_pyarrow()
+    with open_export(path, 'rt', encoding='utf-8-sig') as file:
+        data = json.load(file)
+    # Records are the json itself, or the first list of objects found in it
+    if isinstance(data, dict):
+        data = next((value for value in data.values() if isinstance(value, list) and value and isinstance(value[0], dict)), [data])
+    table = pa.Table.from_pylist(data)
+    while any(pa.types.is_struct(field.type) for field in table.schema):
+        table = table.flatten()
+    return table
+
+def convert_view_to_columnar(view, output_folder, file_format=COLUMNAR_FORMAT):
+    """
+    Converts the CSV export of a view (or its JSON export if there is no CSV) to a columnar file.
+    Compressed exports are read as well (see find_export).
+
+    Conversion is skipped when the columnar file is newer than the export.
+
+    Returns:
+        str: The columnar file. None if the view has no CSV/JSON export.
+    """
+    pa = import_pyarrow()
+    for exporter, reader in (('CSV', read_csv_table), ('JSON', read_json_table)):
+        source = find_export(output_folder, view, exporter)
+        if source:
+            break
+    else:
+        return None
+    target = columnar_path(output_folder, view, file_format)
+    if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source):
+        return target
+    table = reader(source)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp_path = target + '.tmp'
+    if file_format == 'parquet':
+        pa.parquet.write_table(table, tmp_path, compression='zstd')
+    else:
+        # Uncompressed, so reads are zero-copy from the memory-mapped file
+        with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, target)
+    return target
+
+def convert_to_columnar(views_to_convert, output_folder, file_format=COLUMNAR_FORMAT, max_workers=MAX_WORKERS):
+    """
+    Converts the CSV/JSON exports of views to columnar files, in parallel (pyarrow releases the GIL).
+
+    Returns:
+        tuple: (converted, failed) number of views. Views without CSV/JSON export are ignored.
+    """
+    import_pyarrow()
+    converted = failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {executor.submit(convert_view_to_columnar, view, output_folder, file_format): view for view in views_to_convert}
+        for future in as_completed(futures):
+            try:
+                if future.result() is not None:
+                    converted += 1
+            except Exception as e:
+                logging.error(f"Error converting view {futures[future].id} to {file_format}: {e}")
+                failed += 1
+    return converted, failed
+
+def read_view(view_id, output_folder=None, columns=None, filters=None, file_format=COLUMNAR_FORMAT):
+    """
+    Reads the columnar file of a view, memory-mapped.
+
+    Only the requested columns are read, and row filters are pushed down to the file
+    (Parquet row groups that can't match are skipped).
+
+    Args:
+        view_id (int): The id of the view.
+        output_folder (str, optional): The Output folder (default : 'Output' next to the script/exe).
+        columns (list of str, optional): Only read these columns.
+        filters (list of tuple or pyarrow.compute.Expression, optional): Only keep matching rows,
+            e.g. [('Year', '>=', 2020), ('Region', '==', 'Brussels')].
+        file_format (str, optional): 'parquet' or 'arrow', as converted (see the columnar command).
+
+    Returns:
+        pyarrow.Table: The (filtered) table.
+
+    Example:
+        >>> read_view(123, columns=['Year', 'Value'], filters=[('Year', '>=', 2020)]).to_pandas()
+    """
+    pa = import_pyarrow()
+    output_folder = output_folder or get_file_path("Output")
+    # Both formats may exist if the view was converted to each : the other one may be outdated
+    paths = glob.glob(os.path.join(glob.escape(os.path.join(output_folder, COLUMNAR_FOLDER)), 'locale=*', f"view_id={view_id}", f"data.{file_format}"))
+    if not paths:
+        raise FileNotFoundError(f"No {file_format} file for view {view_id}. Convert the exports first (columnar command).")
+    path = paths[0]
+    if isinstance(filters, (list, tuple)):
+        filters = pa.parquet.filters_to_expression(filters)
+    dataset = pa.dataset.dataset(path, format='parquet' if file_format == 'parquet' else 'ipc',
+                                 filesystem=pa.fs.LocalFileSystem(use_mmap=True))
+    return dataset.to_table(columns=columns, filter=filters)
+
+def format_duration(duration):
+    # Format a duration in seconds as "x hour(s), y min, z sec"
+    duration = int(duration)
+    return f"{duration//3600} hour(s), {(duration%3600)//60} min, {duration%60} sec"
+
+def format_size(nbytes):
+    # Format a number of bytes as "12.3 MB"
+    for unit in ('bytes', 'KB', 'MB', 'GB', 'TB'):
+        if nbytes < 1024 or unit == 'TB':
+            return f"{nbytes:.0f} {unit}" if unit == 'bytes' else f"{nbytes:.1f} {unit}"
+        nbytes /= 1024
+
+# ===============================================================
+# Init : Create Output and get api json. Only done when needed (GUI or CLI command)
+# ===============================================================
+def init_output_folder(output_folder=None):
+    """
+    Creates the Output folder (next to the script/exe by default) and sets up the error log in it.
+
+    Returns:
+        str: The Output folder.
+    """
+    output_folder = output_folder or get_file_path("Output")
+    os.makedirs(output_folder, exist_ok=True)
+    # -- Setup logging configuration
+    log_file = os.path.join(output_folder, 'export_errors.log')
+    logging.basicConfig(filename=log_file, level=logging.ERROR, 
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+    return output_folder
+
+def fetch_catalogue():
+    """
+    Fetches the datasources and views from the API.
+
+    Datasource are not exportable. Views are. Each views is linked, via ID, to a datasource.
+
+    Returns:
+        tuple: (datasources, views). Both are None if they could not be fetched.
+    """
+    # --- Send a GET request to fetch the raw JSON data with all views (to get ids)
+    datasources = fetch_data_with_retry(f"{API_URL}/datasources")
+    views = fetch_data_with_retry(f"{API_URL}/views")
+    if datasources is None or views is None:
+        return None, None
+    return datasources, views
+
+def read_catalogue_cache(cache_path):
+    """
+    Reads the cached catalogue.
+
+    Returns:
+        dict: 'fetched_at' (timestamp), 'datasources' and 'views'. None if there is no usable cache.
+    """
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        with gzip.open(cache_path, 'rt', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError) as e:
+        logging.error(f"Could not read catalogue cache {cache_path}: {e}")
+        return None
+
+def write_catalogue_cache(cache_path, datasources, views):
+    # Compact gzipped json. Written to a temp file first, so readers never see a partial cache
+    tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as file:
+        json.dump({'fetched_at': time.time(), 'datasources': datasources, 'views': views}, file, separators=(',', ':'))
+    os.replace(tmp_path, cache_path)
+
+def refresh_catalogue_cache(cache_path, on_refresh=None):
+    """
+    Fetches the catalogue from the API and stores it in the cache, and in a snapshot if it changed (see take_snapshot).
+
+    Args:
+        cache_path (str): The cache file.
+        on_refresh (callable, optional): Called with the new Catalogue once refreshed.
+
+    Returns:
+        tuple: (datasources, views). Both are None if they could not be fetched.
+    """
+    datasources, views = fetch_catalogue()
+    if datasources is None:
+        return None, None
+    try:
+        write_catalogue_cache(cache_path, datasources, views)
+    except OSError as e:
+        logging.error(f"Could not write catalogue cache {cache_path}: {e}")
+    try:
+        take_snapshot(os.path.dirname(cache_path), datasources, views)
+    except OSError as e:
+        logging.error(f"Could not snapshot the catalogue: {e}")
+    if on_refresh:
+        on_refresh(Catalogue(datasources, views))
+    return datasources, views
+
+def load_catalogue(cache_folder=None, ttl=CATALOGUE_CACHE_TTL, stale_while_revalidate=False, on_refresh=None):
+    """
+    Gets the datasources and views, from the local cache when possible.
+
+    - Cache younger than `ttl` : used as is, no network.
+    - Older cache, with `stale_while_revalidate` : used as is, and refreshed in a background thread.
+    - Otherwise the API is called. If it fails, the last cached catalogue is used (offline mode).
+
+    Args:
+        cache_folder (str, optional): Folder of the cache file. No cache if None.
+        ttl (int, optional): Seconds before the cached catalogue is fetched again. 0 to always fetch.
+        stale_while_revalidate (bool, optional): Use an outdated cache and refresh it in the background.
+        on_refresh (callable, optional): Called with the new Catalogue when the background refresh is done.
+            It's called from the background thread.
+
+    Returns:
+        Catalogue: None if it could not be fetched nor found in the cache.
+    """
+    if cache_folder is None:
+        datasources, views = fetch_catalogue()
+        return Catalogue(datasources, views) if datasources is not None else None
+    cache_path = os.path.join(cache_folder, CATALOGUE_CACHE_FILENAME)
+    cached = read_catalogue_cache(cache_path)
+    if cached is not None:
+        if time.time() - cached['fetched_at'] < ttl:
+            return Catalogue(cached['datasources'], cached['views'])
+        if stale_while_revalidate:
+            threading.Thread(target=refresh_catalogue_cache, args=(cache_path, on_refresh), name='catalogue-refresh').start()
+            return Catalogue(cached['datasources'], cached['views'])
+
+    datasources, views = refresh_catalogue_cache(cache_path)
+    if datasources is None and cached is not None:
+        fetched_at = datetime.fromtimestamp(cached['fetched_at']).isoformat(timespec='seconds')
+        logging.error(f"Could not fetch the catalogue. Using the cached catalogue of {fetched_at}.")
+        return Catalogue(cached['datasources'], cached['views'])
+    return Catalogue(datasources, views) if datasources is not None else None
+
+# ===============================================================
+# Catalogue snapshots : what changed in the API since the last fetch, or the last export
+# ===============================================================
+# Every fetch of the catalogue that changes it is saved in Output/snapshots, and its changes are
+# appended to Output/changelog.ndjson. `export --changed-only` exports the views added or changed
+# since the snapshot of the previous --changed-only export with the same filters (see changes_key).
+class CatalogueDiff:
+    """
+    Changes between two catalogues, by id. Records are the raw json of the API.
+
+    Attributes:
+        added (dict): 'datasources' and 'views' -> list of the added records.
+        removed (dict): 'datasources' and 'views' -> list of the removed records.
+        changed (dict): 'datasources' and 'views' -> list of (old record, new record, fields), with
+            fields : {dotted field name (see flatten_record): (old value, new value)}.
+    """
+    def __init__(self, added, removed, changed):
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+
+    def __bool__(self):
+        return any(self.added.values()) or any(self.removed.values()) or any(self.changed.values())
+
+    def changed_views(self, catalogue):
+        """
+        The views of `catalogue` to export again : added or changed views, and views of changed datasources.
+
+        Returns:
+            list of View: In catalogue order.
+        """
+        view_ids = {record['id'] for record in self.added['views']}
+        view_ids.update(new['id'] for _, new, _ in self.changed['views'])
+        datasource_ids = {new['id'] for _, new, _ in self.changed['datasources']}
+        return [view for view in catalogue.views if view.id in view_ids or view.datasource_id in datasource_ids]
+
+    def describe(self):
+        # One line summary, e.g. "views : 3 added, 1 removed, 2 changed (1 renamed). datasources : ..."
+        parts = []
+        for kind in ('views', 'datasources'):
+            renamed = sum(1 for _, _, fields in self.changed[kind] if 'name' in fields)
+            renamed_text = f" ({renamed} renamed)" if renamed else ""
+            parts.append(f"{kind} : {len(self.added[kind])} added, {len(self.removed[kind])} removed, {len(self.changed[kind])} changed{renamed_text}")
+        return '. '.join(parts)
+
+    def changelog_records(self, **extra):
+        """
+        Generator of changelog records : one per added, removed or changed datasource/view, with
+        'type' ('datasource' or 'view'), 'id', 'change' ('added', 'removed' or 'changed'), 'name',
+        the changed 'fields' ({field: [old, new]}), and the `extra` fields (e.g. the snapshot).
+        """
+        for kind, type_name in (('datasources', 'datasource'), ('views', 'view')):
+            for change, records in (('added', self.added[kind]), ('removed', self.removed[kind])):
+                for record in records:
+                    yield {**extra, 'type': type_name, 'id': record['id'], 'change': change, 'name': record.get('name')}
+            for _, new, fields in self.changed[kind]:
+                yield {**extra, 'type': type_name, 'id': new['id'], 'change': 'changed', 'name': new.get('name'),
+                       'fields': {field: list(values) for field, values in fields.items()}}
+
+def diff_records(old_records, new_records):
+    """
+    Diffs two lists of records by id.
+
+    Returns:
+        tuple: (added, removed, changed) as in CatalogueDiff.
+    """
+    old_by_id = {record['id']: record for record in old_records}
+    new_ids = set()
+    added, changed = [], []
+    for record in new_records:
+        new_ids.add(record['id'])
+        old = old_by_id.get(record['id'])
+        if old is None:
+            added.append(record)
+        elif old != record:
+            # Plain dict comparison first : only changed records are flattened field by field
+            old_flat, new_flat = flatten_record(old), flatten_record(record)
+            fields = {field: (old_flat.get(field), new_flat.get(field))
+                      for field in sorted(old_flat.keys() | new_flat.keys()) if old_flat.get(field) != new_flat.get(field)}
+            changed.append((old, record, fields))
+    removed = [record for record in old_records if record['id'] not in new_ids]
+    return added, removed, changed
+
+def diff_catalogues(old, new):
+    """
+    Diffs two catalogues.
+
+    Args:
+        old, new (dict): 'datasources' and 'views' lists of records, e.g. a snapshot (see read_catalogue_cache)
+            or catalogue_records(catalogue).
+
+    Returns:
+        CatalogueDiff: The changes from `old` to `new`.
+    """
+    diffs = {kind: diff_records(old[kind], new[kind]) for kind in ('datasources', 'views')}
+    return CatalogueDiff(*({kind: diff[index] for kind, diff in diffs.items()} for index in range(3)))
+
+def catalogue_records(catalogue):
+    # Raw json of a Catalogue, as in the snapshots
+    return {'datasources': [datasource.data for datasource in catalogue.datasources], 'views': [view.data for view in catalogue.views]}
+
+def list_snapshots(output_folder):
+    # Snapshot files, oldest first
+    return sorted(glob.glob(os.path.join(output_folder, SNAPSHOTS_FOLDER, 'catalogue-*.json.gz')))
+
+def snapshot_name(path):
+    # Output/snapshots/catalogue-20241206-093000-123456.json.gz -> 20241206-093000-123456
+    return os.path.basename(path)[len('catalogue-'):-len('.json.gz')]
+
+def find_snapshot(output_folder, since):
+    """
+    The latest snapshot taken at `since`, or before.
+
+    Args:
+        since (str): A snapshot name, or its beginning : '20241206' (that day), '20241206-09' (that hour)...
+
+    Returns:
+        str: The snapshot file. None if there is no snapshot that old.
+    """
+    candidates = [path for path in list_snapshots(output_folder) if snapshot_name(path)[:len(since)] <= since]
+    return candidates[-1] if candidates else None
+
+def take_snapshot(output_folder, datasources, views):
+    """
+    Saves the catalogue in Output/snapshots if it changed since the last snapshot, and appends
+    the changes to the changelog. The SNAPSHOTS_KEEP latest snapshots are kept, and the ones of
+    the last --changed-only exports.
+
+    Returns:
+        CatalogueDiff: The changes since the previous snapshot (empty if nothing changed). None for the first snapshot.
+    """
+    if not SNAPSHOTS_KEEP:
+        return None
+    snapshots = list_snapshots(output_folder)
+    previous = read_catalogue_cache(snapshots[-1]) if snapshots else None
+    diff = diff_catalogues(previous, {'datasources': datasources, 'views': views}) if previous else None
+    if diff is not None and not diff:
+        return diff
+    now = datetime.now()
+    os.makedirs(os.path.join(output_folder, SNAPSHOTS_FOLDER), exist_ok=True)
+    path = os.path.join(output_folder, SNAPSHOTS_FOLDER, f"catalogue-{now.strftime('%Y%m%d-%H%M%S-%f')}.json.gz")
+    write_catalogue_cache(path, datasources, views)
+    if diff:
+        with open(os.path.join(output_folder, CHANGELOG_FILENAME), 'a', encoding='utf-8', newline='\n') as file:
+            file.writelines(ndjson_lines(diff.changelog_records(at=now.isoformat(timespec='seconds'), snapshot=snapshot_name(path))))
+    # Prune old snapshots
+    exported = {snapshot_path(output_folder, marker['snapshot']) for marker in load_export_markers(output_folder).values()}
+    for old_path in list_snapshots(output_folder)[:-SNAPSHOTS_KEEP]:
+        if old_path not in exported:
+            os.remove(old_path)
+    return diff
+
+def snapshot_path(output_folder, name):
+    # Path of a snapshot from its name (see snapshot_name)
+    return os.path.join(output_folder, SNAPSHOTS_FOLDER, f"catalogue-{name}.json.gz")
+
+def changes_key(exporters=None, languages=None, pattern=None):
+    """
+    Key of the --changed-only exports with these filters : each filter has its own last export,
+    so e.g. `--lang fr` then `--lang nl` both export the views changed since their own last run.
+
+    Returns:
+        str: e.g. 'formats=CSV,JSON lang=fr views-regex=^Pop'. The key of export-all by default.
+    """
+    formats = ','.join(sorted(exporters or VALID_EXPORTERS))
+    langs = ','.join(sorted(languages)) if languages else '*'
+    return f"formats={formats} lang={langs} views-regex={pattern or ''}"
+
+def load_export_markers(output_folder):
+    # {changes_key: {'snapshot', 'exported_at'}} of the last --changed-only exports. Empty if there is none
+    markers = load_state_file(os.path.join(output_folder, SNAPSHOTS_FOLDER, EXPORTED_SNAPSHOT_FILENAME), 'changed-only markers')
+    # Files of the first versions hold a single marker, of any filter : ignored
+    return {key: marker for key, marker in markers.items() if isinstance(marker, dict) and 'snapshot' in marker}
+
+def exported_snapshot(output_folder, key=None):
+    # Snapshot of the last --changed-only export with the filters of `key` (see changes_key). None if there is none
+    marker = load_export_markers(output_folder).get(key or changes_key())
+    if marker is None:
+        return None
+    path = snapshot_path(output_folder, marker['snapshot'])
+    return path if os.path.exists(path) else None
+
+def changed_views(catalogue, output_folder, since=None, key=None, fallback_previous=False):
+    """
+    The views added or changed since a snapshot (see CatalogueDiff.changed_views).
+
+    The current catalogue is snapshotted first if needed, so the next call starts from it
+    (see mark_changes_exported).
+
+    Args:
+        catalogue (Catalogue): The current catalogue.
+        output_folder (str): The Output folder.
+        since (str, optional): The snapshot to compare to (see find_snapshot). By default, the
+            snapshot of the last --changed-only export with the filters of `key`.
+        key (str, optional): See changes_key. The key of export-all by default.
+        fallback_previous (bool, optional): Without a --changed-only export for `key`, compare to the
+            previous snapshot (e.g. to show the last changes). By default, all views are returned :
+            a filter exported for the first time exports everything.
+
+    Returns:
+        tuple: (views, diff, reference). `reference` is the snapshot compared to. Without any
+        snapshot to compare to, all views with a None diff and reference.
+    """
+    current = catalogue_records(catalogue)
+    take_snapshot(output_folder, current['datasources'], current['views'])
+    if since:
+        reference = find_snapshot(output_folder, since)
+    else:
+        snapshots = list_snapshots(output_folder)
+        reference = exported_snapshot(output_folder, key)
+        if reference is None and fallback_previous and len(snapshots) > 1:
+            reference = snapshots[-2]
+    previous = read_catalogue_cache(reference) if reference else None
+    if previous is None:
+        return list(catalogue.views), None, None
+    diff = diff_catalogues(previous, current)
+    return diff.changed_views(catalogue), diff, reference
+
+def mark_changes_exported(output_folder, key=None):
+    # The next --changed-only export with the filters of `key` (see changes_key) starts from the current (latest) snapshot
+    snapshots = list_snapshots(output_folder)
+    if not snapshots:
+        return
+    markers = load_export_markers(output_folder)
+    markers[key or changes_key()] = {'snapshot': snapshot_name(snapshots[-1]), 'exported_at': datetime.now().isoformat(timespec='seconds')}
+    # Markers saved in the meantime by runs with other filters are kept (see save_state_file)
+    save_state_file(markers, os.path.join(output_folder, SNAPSHOTS_FOLDER, EXPORTED_SNAPSHOT_FILENAME), indent=1)
+
+def remove_renamed_exports(diff, catalogue, views, exporters, output_folder):
+    """
+    Deletes the files exported under the previous name of renamed views, and their manifest
+    entries : renamed views are exported again under their new name.
+
+    A file is kept if a view of the current catalogue still has that name (views with the same
+    name share the same file).
+
+    Args:
+        diff (CatalogueDiff): The changes of the catalogue.
+        catalogue (Catalogue): The current catalogue.
+        views (list of View): Only these views are cleaned, e.g. the views of the export.
+        exporters (list of str): Formats to clean.
+        output_folder (str): The Output folder.
+
+    Returns:
+        int: The number of deleted files.
+    """
+    view_ids = {view.id for view in views}
+    current_names = {sanitize_filename(view.name) for view in catalogue.views}
+    manifest = load_manifest(output_folder)
+    manifest_size = len(manifest)
+    removed = 0
+    for old, new, fields in diff.changed['views']:
+        old_name = sanitize_filename(old.get('name') or '')
+        if 'name' not in fields or new['id'] not in view_ids or old_name in current_names:
+            continue
+        for exporter in exporters:
+            # Raw and compressed files (see export_path)
+            for suffix in ('', *COMPRESSION_SUFFIXES.values()):
+                path = os.path.join(output_folder, exporter, f"{old_name}.{exporter}{suffix}")
+                if os.path.exists(path):
+                    try:
+                        os.remove(path)
+                        removed += 1
+                    except OSError as e:
+                        logging.error(f"Could not remove {path}: {e}")
+            entry = manifest.get(manifest_key(new['id'], exporter))
+            if entry and not os.path.exists(os.path.join(output_folder, entry['path'])):
+                del manifest[manifest_key(new['id'], exporter)]
+    if len(manifest) != manifest_size:
+        save_manifest(manifest, output_folder)
+    return removed
+
+# ===============================================================
+# Async backend (aiohttp) : thousands of concurrent requests from one thread
+# ===============================================================
+# Same files, manifest, history and blob store as the threads backend. Embed it in an asyncio
+# application with async_fetch_catalogue() and async_export(), or run it from sync code with
+# export_views(..., backend='async').
+def import_aiohttp():
+    # aiohttp is only needed by the async backend
+    try:
+        import aiohttp
+    except ImportError:
+        raise ImportError("The async backend needs aiohttp : pip install aiohttp") from None
+    return aiohttp
+
+def open_async_session(concurrency=ASYNC_CONCURRENCY):
+    """
+    Opens an aiohttp session with up to `concurrency` connections, kept alive.
+    Must be called from a running event loop. Close it with `await session.close()`.
+    """
+    aiohttp = import_aiohttp()
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=concurrency),
+        timeout=aiohttp.ClientTimeout(sock_connect=DOWNLOAD_TIMEOUT, sock_read=DOWNLOAD_TIMEOUT),
+    )
+
+async def async_http_get(session, url, headers=None, retries=HTTP_RETRIES, backoff=HTTP_BACKOFF):
+    """
+    http_get for the async backend : GET with the rate limit and retries (see http_get).
+
+    Returns:
+        aiohttp.ClientResponse: The response, to be released by the caller (`async with response`).
+        `retries` is the number of retries.
+
+    Raises:
+        aiohttp.ClientConnectionError, asyncio.TimeoutError: After the last attempt.
+    """
+    import asyncio
+    aiohttp = import_aiohttp()
+    attempt = 0
+    while True:
+        await asyncio.sleep(rate_limiter.reserve())
+        try:
+            response = await session.get(url, headers=headers)
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            attempt += 1
+            if attempt >= retries:
+                raise
+            delay = backoff_delay(attempt, base=backoff)
+            logging.error(f"{type(e).__name__}: {e}. Retrying in {delay:.1f} seconds...")
+        else:
+            response.retries = attempt
+            if response.status not in RETRY_STATUS_CODES:
+                return response
+            attempt += 1
+            if attempt >= retries:
+                return response
+            delay = backoff_delay(attempt, response.headers.get('Retry-After'), base=backoff)
+            logging.error(f"HTTP {response.status} for {url}. Retrying in {delay:.1f} seconds...")
+            response.release()
+        await asyncio.sleep(delay)
+
+async def async_fetch_data(session, url, retries=5, delay=3):
+    # fetch_data_with_retry for the async backend. None if the request failed
+    start = time.perf_counter()
+    telemetry = {'kind': 'catalogue', 'url': url}
+    try:
+        response = await async_http_get(session, url, retries=retries, backoff=delay)
+        async with response:
+            telemetry.update(status=response.status, retries=response.retries)
+            response.raise_for_status()
+            content = await response.read()
+        record_request(**telemetry, bytes=len(content), total=time.perf_counter() - start)
+        return json.loads(content)
+    except Exception as e:
+        logging.error(f"{type(e).__name__}: {e}. Could not fetch {url}.")
+        record_request(**telemetry, total=time.perf_counter() - start, error=f"{type(e).__name__}: {e}")
+        return None
+
+async def async_fetch_catalogue(session=None):
+    """
+    fetch_catalogue for the async backend : datasources and views are fetched concurrently.
+
+    Args:
+        session (aiohttp.ClientSession, optional): The session to use. A new one by default.
+
+    Returns:
+        Catalogue: None if it could not be fetched.
+    """
+    import asyncio
+    own_session = session is None
+    session = session or open_async_session()
+    try:
+        datasources, views = await asyncio.gather(
+            async_fetch_data(session, f"{API_URL}/datasources"),
+            async_fetch_data(session, f"{API_URL}/views"),
+        )
+    finally:
+        if own_session:
+            await session.close()
+    if datasources is None or views is None:
+        return None
+    return Catalogue(datasources, views)
+
+async def async_download_attempt(session, url, partial_filename, headers, chunk_size, spool_size=0, compression=None, compression_level=None):
+    """
+    download_attempt for the async backend. The file is downloaded from the start (no Range resume),
+    and written from a worker thread, so disk writes don't block the event loop.
+    With `compression`, gzip is requested and decoded by aiohttp : chunks are compressed again
+    in the worker thread.
+    """
+    import asyncio
+    headers = {**(headers or {}), 'Accept-Encoding': 'gzip' if compression else 'identity'}
+    response = await async_http_get(session, url, headers)
+    result = {'status': response.status, 'retries': response.retries, 'connect': None, 'ttfb': None}
+    async with response:
+        if response.status == 304:
+            return {**result, 'transfer': 0.0, 'size': 0}
+        response.raise_for_status()
+        # Content-Length is the size of the body as sent : not comparable to decoded bytes
+        expected_size = response.content_length if 'Content-Encoding' not in response.headers else None
+        compressor = new_compressor(compression, compression_level) if compression else None
+        sha256 = hashlib.sha256()
+        size = received = 0
+        transfer_start = time.perf_counter()
+        if spool_size and response.content_length is not None and response.content_length <= spool_size:
+            # Small file : hashed in memory, only written to disk if its content is new (see store_blob)
+            content = await response.read()
+            received = len(content)
+            if compressor:
+                content = compressor.compress(content) + compressor.flush()
+            sha256.update(content)
+            size = len(content)
+        else:
+            content = None
+            file = await asyncio.to_thread(open, partial_filename, 'wb')
+
+            def write(chunk, final=False):
+                # Compress and write, from a worker thread
+                if compressor:
+                    chunk = compressor.compress(chunk) + (compressor.flush() if final else b'')
+                file.write(chunk)
+                sha256.update(chunk)
+                return len(chunk)
+
+            try:
+                async for chunk in response.content.iter_chunked(chunk_size):
+                    received += len(chunk)
+                    size += await asyncio.to_thread(write, chunk)
+                if compressor:
+                    size += await asyncio.to_thread(write, b'', True)
+            finally:
+                await asyncio.to_thread(file.close)
+        result['transfer'] = time.perf_counter() - transfer_start
+    if expected_size is not None and received != expected_size:
+        raise IncompleteDownloadError(f"Received {received} of {expected_size} bytes for {url}")
+    return {
+        **result,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'size': size,
+        'sha256': sha256.hexdigest(),
+        'content': content,
+    }
+
+async def async_download_file(session, url, local_filename, headers=None, chunk_size=DOWNLOAD_CHUNK_SIZE, retries=DOWNLOAD_RETRIES, blobs_folder=None,
+                              compression=None, compression_level=None):
+    """
+    download_file for the async backend : streamed into a partial file, renamed once complete
+    (or stored in `blobs_folder`), with retries of interrupted transfers.
+
+    Returns:
+        dict: See download_file.
+    """
+    import asyncio
+    aiohttp = import_aiohttp()
+    partial_filename = local_filename + PARTIAL_SUFFIX
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            result = await async_download_attempt(session, url, partial_filename, headers, chunk_size, DEDUP_SPOOL_SIZE if blobs_folder else 0,
+                                                  compression, compression_level)
+            break
+        except (IncompleteDownloadError, aiohttp.ClientPayloadError, aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            if attempt >= retries:
+                raise
+            delay = backoff_delay(attempt)
+            logging.error(f"Download of {url} interrupted: {e}. Retrying in {delay:.1f} seconds...")
+        await asyncio.sleep(delay)
+
+    result['duplicate'] = False
+    if result['status'] == 200 and blobs_folder:
+        result['duplicate'] = await asyncio.to_thread(store_blob, blobs_folder, result['sha256'], local_filename, partial_filename, result['content'])
+    elif result['status'] == 200:
+        await asyncio.to_thread(os.replace, partial_filename, local_filename)
+        await asyncio.to_thread(remove_partial, partial_filename)
+    result.pop('content', None)
+    result['retries'] += attempt - 1
+    return result
+
+async def async_run_downloads(session, tasks, concurrency=ASYNC_CONCURRENCY, on_progress=None, manifest=None, output_folder=None, control=None, blobs_folder=None, history=None):
+    """
+    run_downloads for the async backend : `concurrency` workers of the event loop take the tasks in order.
+
+    Cancelling the coroutine (e.g. asyncio.Task.cancel()) stops all downloads at once. Partial
+    files are left behind, and replaced by the next export.
+
+    Returns:
+        DownloadProgress: The final counters of the run. Cancelled files are not counted.
+    """
+    import asyncio
+    progress = DownloadProgress(len(tasks), sum(task.get('estimated_seconds', 0.0) for task in tasks), max(1, concurrency))
+    control = control or ExportControl()
+    pending = iter(tasks)
+
+    async def worker():
+        # Workers only switch at `await` : no lock needed around the manifest and history
+        for task in pending:
+            if not await control.async_wait():
+                return
+            key = manifest_key(task['id'], task['exporter'])
+            headers = conditional_headers(manifest.get(key), task['path']) if manifest is not None else {}
+            telemetry = {'kind': 'download', 'view_id': task['id'], 'exporter': task['exporter'], 'url': task['url']}
+            start = time.perf_counter()
+            try:
+                result = await async_download_file(session, task['url'], task['path'], headers, blobs_folder=blobs_folder,
+                                                   compression=task.get('compression'), compression_level=task.get('compression_level'))
+            except Exception as e:
+                # Log the error, continue with the next file
+                logging.error(f"Error downloading {task['url']}: {e}")
+                status = getattr(e, 'status', None)
+                record_request(**telemetry, status=status, total=time.perf_counter() - start, error=f"{type(e).__name__}: {e}")
+                if history is not None:
+                    update_history(history, key, status)
+                progress.record(False, planned=task.get('estimated_seconds', 0.0), task={**task, 'status': status})
+            else:
+                duration = time.perf_counter() - start
+                record_request(**telemetry, status=result['status'], bytes=result['size'], retries=result['retries'],
+                               transfer=result['transfer'], total=duration)
+                if history is not None:
+                    update_history(history, key, result['status'], result['size'], duration)
+                if result['status'] == 304:
+                    progress.record(True, unchanged=True, planned=task.get('estimated_seconds', 0.0))
+                else:
+                    if manifest is not None:
+                        manifest[key] = {
+                            'path': os.path.relpath(task['path'], output_folder),
+                            'etag': result['etag'],
+                            'last_modified': result['last_modified'],
+                            'size': result['size'],
+                            'sha256': result['sha256'],
+                            'timestamp': datetime.now().isoformat(timespec='seconds'),
+                        }
+                    progress.record(True, result['size'], duplicate=result['duplicate'], planned=task.get('estimated_seconds', 0.0))
+            if on_progress:
+                on_progress(progress)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, len(tasks))))))
+    return progress
+
+async def async_export(views, formats, languages=None, output_folder=None, concurrency=ASYNC_CONCURRENCY, incremental=False,
+                       deduplicate=False, retry_failed=False, on_progress=None, control=None, plan=None, session=None,
+                       compression=COMPRESSION, compression_level=COMPRESSION_LEVEL):
+    """
+    Exports views in the given formats, with the async backend (see export_views).
+
+    Example:
+        >>> catalogue = await async_fetch_catalogue()
+        >>> progress = await async_export(catalogue.views, ['CSV'], languages=['fr'], output_folder='Output')
+
+    Args:
+        views (list of View): Views to export.
+        formats (list of str): Formats to export, from VALID_EXPORTERS.
+        languages (list of str, optional): Only export the views in these languages. All by default.
+        output_folder (str, optional): The Output folder (default : 'Output' next to the script/exe).
+        concurrency (int, optional): Max simultaneous requests.
+        incremental, deduplicate, retry_failed, on_progress, control, plan, compression, compression_level: See export_views.
+        session (aiohttp.ClientSession, optional): The session to use. A new one by default.
+
+    Returns:
+        DownloadProgress: The final counters of the export.
+    """
+    import asyncio
+    output_folder = output_folder or get_file_path("Output")
+    if languages:
+        views = [view for view in views if view.locale in languages]
+    # --- Plan : skip files known to fail, largest first
+    history = await asyncio.to_thread(load_history, output_folder)
+    manifest = await asyncio.to_thread(load_manifest, output_folder) if incremental else None
+    if plan is None:
+        tasks = await asyncio.to_thread(build_export_tasks, views, formats, output_folder, compression, compression_level)
+        plan = plan_export(tasks, history, concurrency, manifest, retry_failed)
+    # --- Download all files. Incremental : only changed files
+    blobs_folder = await asyncio.to_thread(dedup_blobs_folder, output_folder) if deduplicate else None
+    own_session = session is None
+    session = session or open_async_session(concurrency)
+    try:
+        progress = await async_run_downloads(session, plan.tasks, concurrency, on_progress, manifest, output_folder, control, blobs_folder, history)
+        progress.skipped = len(plan.skipped)
+        return progress
+    finally:
+        if own_session:
+            await session.close()
+        # From a worker thread : the state file locks and the blobs walk must not block the event loop
+        await asyncio.to_thread(save_history, history, output_folder)
+        if manifest is not None:
+            await asyncio.to_thread(save_manifest, manifest, output_folder)
+        if blobs_folder:
+            await asyncio.to_thread(prune_blobs, blobs_folder)
+
+# ===============================================================
+# Command line
+# ===============================================================
+EXIT_OK = 0
+EXIT_EXPORT_ERRORS = 1  # Some files could not be exported
+EXIT_NO_CATALOGUE = 3  # Datasources or views could not be fetched (2 is used by argparse for usage errors)
+
+def comma_separated(valid_values, normalize):
+    # argparse type : "CSV,json" -> ['CSV', 'JSON'], checked against valid_values
+    def parse(value):
+        items = [normalize(item.strip()) for item in value.split(',') if item.strip()]
+        invalid = [item for item in items if item not in valid_values]
+        if invalid or not items:
+            raise argparse.ArgumentTypeError(f"invalid value(s) {', '.join(invalid) or value!r}. Choose among {','.join(valid_values)}")
+        return items
+    return parse
+
+def shard_argument(value):
+    # argparse type : "2/8" -> (2, 8), shard 2 of 8 (shards 0 to 7)
+    match = re.fullmatch(r'(\d+)/(\d+)', value.strip())
+    if not match or not int(match.group(1)) < int(match.group(2)):
+        raise argparse.ArgumentTypeError(f"invalid shard {value!r}. Use INDEX/COUNT, with INDEX from 0 to COUNT-1 (e.g. 0/4)")
+    return int(match.group(1)), int(match.group(2))
+
+def build_parser():
+    def add_common_arguments(parser, suppress):
+        # Options shared by all commands. Can be given before or after the command :
+        # after the command, defaults are SUPPRESS so they don't override the ones given before
+        def default(value):
+            return argparse.SUPPRESS if suppress else value
+        parser.add_argument('--output', default=default(None), help="Output folder (default : 'Output' next to the script/exe)")
+        parser.add_argument('--cache-ttl', type=int, default=default(CATALOGUE_CACHE_TTL),
+                            help=f"Seconds before the cached catalogue is fetched again (default : {CATALOGUE_CACHE_TTL})")
+        parser.add_argument('--refresh-catalogue', action='store_true', default=default(False), help="Ignore the cached catalogue")
+        parser.add_argument('--stale-while-revalidate', action='store_true', default=default(False),
+                            help="Use an outdated cached catalogue and refresh it in the background")
+
+    parser = argparse.ArgumentParser(
+        prog='StatBel_OpenDatasets',
+        description="Export StatBel open datasets (views). Without command, the GUI is started.",
+    )
+    add_common_arguments(parser, suppress=False)
+    common = argparse.ArgumentParser(add_help=False)
+    add_common_arguments(common, suppress=True)
+
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.add_parser('gui', parents=[common], help="Start the GUI (default)")
+    metadata_parser = subparsers.add_parser('metadata', parents=[common], help="Export the metadata of the datasources and views")
+    metadata_parser.add_argument('--formats', type=comma_separated(METADATA_FORMATS, str.lower), default=['txt'],
+                                 help=f"Comma separated formats among {','.join(METADATA_FORMATS)} (default : txt)")
+
+    # Options shared by the export commands
+    export_common = argparse.ArgumentParser(add_help=False)
+    export_common.add_argument('--jobs', type=int, default=None,
+                               help=f"Number of parallel downloads (default : {MAX_WORKERS}, {ASYNC_CONCURRENCY} with --backend async). "
+                                    f"With --backend threads, at most --max-per-host of them")
+    export_common.add_argument('--max-per-host', type=int, default=MAX_CONNECTIONS_PER_HOST,
+                               help=f"Max simultaneous connections to the API with --backend threads (default : {MAX_CONNECTIONS_PER_HOST})")
+    export_common.add_argument('--backend', choices=['threads', 'async'], default=EXPORT_BACKEND,
+                               help=f"Download with threads (requests) or from one thread with asyncio (needs aiohttp) (default : {EXPORT_BACKEND})")
+    export_common.add_argument('--incremental', action='store_true', help="Only download files that changed since the last export")
+    export_common.add_argument('--plan', action='store_true', help="Only show the export plan : files, estimated size and duration. Nothing is downloaded")
+    export_common.add_argument('--retry-failed', action='store_true', help="Also request the files that failed in the previous runs (skipped otherwise)")
+    export_common.add_argument('--dedup', action='store_true', help="Store identical files once (Output/blobs), format folders get hardlinks")
+    export_common.add_argument('--compress', choices=list(COMPRESSION_SUFFIXES), default=COMPRESSION,
+                               help=f"Compress the {','.join(COMPRESSIBLE_EXPORTERS)} files while downloading them (.gz, or .zst : needs zstandard)")
+    export_common.add_argument('--compress-level', type=int, default=COMPRESSION_LEVEL,
+                               help="Compression level (default : gzip 6, zstd 3). With gzip, files the server already gzips are compressed again at this level")
+    export_common.add_argument('--rate-limit', type=float, default=HTTP_RATE_LIMIT, help="Max requests per second sent to the API (default : no limit)")
+    export_common.add_argument('--prometheus-textfile', default=None, help="Also write the run stats to this Prometheus textfile (.prom)")
+    export_common.add_argument('--columnar', action='store_true', help=f"Then convert the CSV/JSON exports to {COLUMNAR_FORMAT} files (needs pyarrow)")
+    export_common.add_argument('--changed-only', action='store_true',
+                               help="Only export the views added or changed since the last --changed-only export with the same formats, languages and --views-regex (see the changes command)")
+    export_common.add_argument('--since', default=None, metavar='SNAPSHOT',
+                               help="With --changed-only : compare to this snapshot instead, e.g. 20241206 (the last one of that day)")
+    sharding = export_common.add_mutually_exclusive_group()
+    sharding.add_argument('--processes', type=int, default=None,
+                          help="Split the export into this many shards, run in parallel processes (e.g. the number of cores), each with --jobs downloads")
+    sharding.add_argument('--shard', type=shard_argument, default=None, metavar='INDEX/COUNT',
+                          help="Only export shard INDEX (0 to COUNT-1) of COUNT, e.g. one per machine sharing the Output folder. "
+                               "Run merge-shards once all shards are done")
+
+    export_parser = subparsers.add_parser('export', parents=[common, export_common], help="Export views, filtered by format, language and name")
+    export_parser.add_argument('--formats', type=comma_separated(VALID_EXPORTERS, str.upper), default=VALID_EXPORTERS,
+                               help=f"Comma separated formats (default : {','.join(VALID_EXPORTERS)})")
+    export_parser.add_argument('--lang', type=comma_separated(VALID_LANGUAGES, str.lower), default=None,
+                               help=f"Comma separated languages among {','.join(VALID_LANGUAGES)} (default : all)")
+    export_parser.add_argument('--views-regex', default=None, help="Only export views whose name matches this regular expression")
+
+    subparsers.add_parser('export-all', parents=[common, export_common],
+                          help="Export all views in all formats. With --incremental, files of removed views are deleted")
+
+    changes_parser = subparsers.add_parser('changes', parents=[common],
+                                           help="Print the views and datasources added, removed or changed since a catalogue snapshot, as NDJSON")
+    changes_parser.add_argument('--since', default=None, metavar='SNAPSHOT',
+                                help="Snapshot to compare to, e.g. 20241206 (the last one of that day). Default : the one of the last --changed-only export-all, or the previous one")
+
+    merge_parser = subparsers.add_parser('merge-shards', parents=[common],
+                                         help="Merge the manifests and histories of finished shards (export --shard), and retry their failed files")
+    merge_parser.add_argument('--jobs', type=int, default=None,
+                              help=f"Number of parallel downloads of the retries (default : {MAX_WORKERS}, {ASYNC_CONCURRENCY} with --backend async)")
+    merge_parser.add_argument('--max-per-host', type=int, default=MAX_CONNECTIONS_PER_HOST,
+                              help=f"Max simultaneous connections to the API with --backend threads (default : {MAX_CONNECTIONS_PER_HOST})")
+    merge_parser.add_argument('--backend', choices=['threads', 'async'], default=EXPORT_BACKEND, help=f"Download backend of the retries (default : {EXPORT_BACKEND})")
+    merge_parser.add_argument('--no-retry', action='store_true', help="Don't retry the failed files")
+
+    columnar_parser = subparsers.add_parser('columnar', parents=[common], help="Convert the CSV/JSON exports to typed columnar files (needs pyarrow)")
+    columnar_parser.add_argument('--lang', type=comma_separated(VALID_LANGUAGES, str.lower), default=None,
+                                 help=f"Comma separated languages among {','.join(VALID_LANGUAGES)} (default : all)")
+    columnar_parser.add_argument('--views-regex', default=None, help="Only convert views whose name matches this regular expression")
+    columnar_parser.add_argument('--format', choices=['parquet', 'arrow'], default=COLUMNAR_FORMAT, help=f"Columnar format (default : {COLUMNAR_FORMAT})")
+    columnar_parser.add_argument('--jobs', type=int, default=MAX_WORKERS, help=f"Number of parallel conversions (default : {MAX_WORKERS})")
+    return parser
+
+def run_command(args):
+    """
+    Runs a CLI command (metadata, changes, export, export-all, merge-shards, columnar) without any GUI.
+
+    Returns:
+        int: The exit code.
+    """
+    output_folder = init_output_folder(args.output)
+    # Also report errors on the console, not only in the log file
+    if sys.stderr is not None:
+        console = logging.StreamHandler()
+        console.setLevel(logging.ERROR)
+        logging.getLogger().addHandler(console)
+    # Exports : record the timings of all requests, catalogue included
+    report = start_run_report() if args.command in ('export', 'export-all', 'merge-shards') else None
+
+    if args.command == 'merge-shards':
+        # Nothing to fetch : the failed files are in the state of the shards
+        jobs = args.jobs or (ASYNC_CONCURRENCY if args.backend == 'async' else MAX_WORKERS)
+        set_max_connections_per_host(args.max_per_host)
+        start_time = time.monotonic()
+        progress = finish_sharded_export(output_folder, jobs, args.backend, retry=not args.no_retry)
+        print_export_summary(progress, start_time)
+        print(f"Report : {report.write(output_folder)}")
+        return EXIT_EXPORT_ERRORS if progress.failed else EXIT_OK
+
+    catalogue = load_catalogue(output_folder, 0 if args.refresh_catalogue else args.cache_ttl, args.stale_while_revalidate)
+    if catalogue is None:
+        print(f"Datasources or Views data is missing. Please check the logfile ({output_folder})", file=sys.stderr)
+        return EXIT_NO_CATALOGUE
+
+    if args.command == 'metadata':
+        for path in export_metadata(catalogue, output_folder, args.formats):
+            print(path)
+        return EXIT_OK
+
+    if args.command == 'changes':
+        _, diff, reference = changed_views(catalogue, output_folder, args.since, fallback_previous=True)
+        if diff is None:
+            print(f"No snapshot taken at {args.since} or before." if args.since else "No snapshot to compare to yet.", file=sys.stderr)
+            return EXIT_OK
+        print(f"Changes since snapshot {snapshot_name(reference)} : {diff.describe()}.", file=sys.stderr)
+        sys.stdout.writelines(ndjson_lines(diff.changelog_records()))
+        return EXIT_OK
+
+    if args.command == 'columnar':
+        try:
+            views_to_convert = catalogue.select(languages=args.lang, pattern=args.views_regex)
+        except re.error as e:
+            print(f"Invalid --views-regex : {e}", file=sys.stderr)
+            return 2
+        return run_columnar(views_to_convert, output_folder, args.format, args.jobs)
+
+    if args.command == 'export-all':
+        filtered_views = catalogue.views
+        exporters = VALID_EXPORTERS
+    else:
+        try:
+            filtered_views = catalogue.select(languages=args.lang, pattern=args.views_regex)
+        except re.error as e:
+            print(f"Invalid --views-regex : {e}", file=sys.stderr)
+            return 2
+        exporters = args.formats
+    # Each filter has its own last --changed-only export
+    export_changes_key = changes_key(exporters, None if args.command == 'export-all' else args.lang,
+                                     None if args.command == 'export-all' else args.views_regex)
+    if args.changed_only:
+        views_to_update, diff, reference = changed_views(catalogue, output_folder, args.since, export_changes_key)
+        if diff is None:
+            print(f"No snapshot taken at {args.since} or before : all views are exported." if args.since
+                  else "First --changed-only export with these filters : all views are exported.")
+        else:
+            print(f"Changes since snapshot {snapshot_name(reference)} : {diff.describe()}.")
+        ids_to_update = {view.id for view in views_to_update}
+        filtered_views = [view for view in filtered_views if view.id in ids_to_update]
+    jobs = args.jobs or (ASYNC_CONCURRENCY if args.backend == 'async' else MAX_WORKERS)
+    try:
+        if args.backend == 'async':
+            import_aiohttp()
+        if args.compress:
+            new_compressor(args.compress, args.compress_level)  # zstandard installed, valid level
+    except (ImportError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 2
+    set_max_connections_per_host(args.max_per_host)
+    plan = plan_views_export(filtered_views, exporters, output_folder, jobs, args.incremental, args.retry_failed, args.backend,
+                             args.compress, args.compress_level, args.processes or 1)
+    if args.shard:
+        plan = shard_plan(plan, *args.shard, parallel_downloads(jobs, args.backend))
+        print(f"Shard {args.shard[0]} of {args.shard[1]}.")
+    print(f"Plan : {plan.describe()} ({plan.from_history} estimated from previous runs).")
+    if args.plan:
+        return EXIT_OK
+
+    set_rate_limit(args.rate_limit)
+    start_time = time.monotonic()
+    if args.command == 'export-all' and args.incremental and not args.shard:
+        # Files of views removed from the API (all of them, even with --changed-only) are deleted.
+        # Not by shards : they don't own the whole manifest
+        prune_removed_views(catalogue.views, output_folder)
+    if args.changed_only and diff:
+        # Renamed views are exported under their new name : their old files are deleted
+        removed = remove_renamed_exports(diff, catalogue, filtered_views, exporters, output_folder)
+        if removed:
+            print(f"{removed} file(s) of renamed views deleted.")
+    if args.shard:
+        progress = export_shard(plan, output_folder, *args.shard, jobs, args.incremental, args.dedup, args.backend)
+    elif args.processes:
+        progress = export_sharded(filtered_views, exporters, output_folder, args.processes, jobs, args.incremental, args.dedup, plan=plan,
+                                  backend=args.backend, compression=args.compress, compression_level=args.compress_level)
+    else:
+        progress = export_views(filtered_views, exporters, output_folder, jobs, args.incremental, deduplicate=args.dedup, plan=plan, backend=args.backend,
+                                compression=args.compress, compression_level=args.compress_level)
+
+    print_export_summary(progress, start_time)
+    if args.changed_only and not args.shard and not progress.failed:
+        # Failed files : the same changes are exported again next time
+        mark_changes_exported(output_folder, export_changes_key)
+    if args.shard:
+        print(f"Run merge-shards once the {args.shard[1]} shards are done.")
+    print(f"Report : {report.write(output_folder, f'-shard-{args.shard[0]}-of-{args.shard[1]}' if args.shard else '')}")
+    if args.prometheus_textfile:
+        report.write_prometheus(args.prometheus_textfile)
+    if args.columnar:
+        columnar_exit_code = run_columnar(filtered_views, output_folder, COLUMNAR_FORMAT, args.jobs or MAX_WORKERS)
+        if columnar_exit_code != EXIT_OK:
+            return columnar_exit_code
+    if progress.failed:
+        print(f"Check {os.path.join(output_folder, 'export_errors.log')} for details.", file=sys.stderr)
+        return EXIT_EXPORT_ERRORS
+    return EXIT_OK
+
+def print_export_summary(progress, start_time):
+    # Last line of the export commands
+    deduplicated_text = f", {progress.deduplicated} deduplicated" if progress.deduplicated else ""
+    skipped_text = f", {progress.skipped} skipped (--retry-failed to request them)" if progress.skipped else ""
+    print(f"{progress.done} file(s) exported ({progress.bytes} bytes){deduplicated_text}, {progress.unchanged} unchanged, "
+          f"{progress.failed} failed{skipped_text}. Duration : {format_duration(time.monotonic() - start_time)}")
+
+def run_columnar(views_to_convert, output_folder, file_format, jobs):
+    # Columnar conversion step of the CLI. Returns the exit code
+    start_time = time.monotonic()
+    try:
+        converted, failed = convert_to_columnar(views_to_convert, output_folder, file_format, jobs)
+    except ImportError as e:
+        print(e, file=sys.stderr)
+        return EXIT_EXPORT_ERRORS
+    print(f"{converted} view(s) converted to {file_format}, {failed} failed. Duration : {format_duration(time.monotonic() - start_time)}")
+    return EXIT_EXPORT_ERRORS if failed else EXIT_OK
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command in (None, 'gui'):
+        run_gui(args.output, 0 if args.refresh_catalogue else args.cache_ttl)
+        return EXIT_OK
+    return run_command(args)
+
+# ===============================================================
+# GUI
+# ===============================================================
+def run_gui(output_folder=None, cache_ttl=CATALOGUE_CACHE_TTL):
+    """
+    Builds and runs the Tkinter window. Tkinter is only imported here, so the
+    module can be used on headless servers.
+
+    The window opens right away : the catalogue is loaded in the background (the cached one,
+    even if outdated, then refreshed), and the tabs are built the first time they are shown.
+    """
+    import tkinter as tk
+    from tkinter import ttk, messagebox
+
+    # --- Init : Output folder and api json
+    output_folder = init_output_folder(output_folder)
+
+    def on_catalogue_refresh(new_catalogue):
+        # Background refresh : used by the next actions
+        nonlocal catalogue
+        new_catalogue.build_search_index()
+        catalogue = new_catalogue
+
+    catalogue = None  # Loaded in the background once the window is shown (see load_catalogue_in_background)
+
+    # ===============================================================
+    # Buttons actions
+    # ===============================================================
+    def on_create_metadata():
+        Metadata_path = create_metadata(catalogue, output_folder)
+        metadata_lb.config(text=f"Export done ! See {Metadata_path}")
+
+    def on_create_linked_views_metadata():
+        Metadata_path = create_linked_views_metadata(catalogue, output_folder)
+        metadatalk_lb.config(text=f"Results have been written to {Metadata_path}")
+
+    def on_export_metadata_files():
+        export_metadata(catalogue, output_folder, ['ndjson', 'csv', 'sqlite'])
+        metadata_files_lb.config(text=f"Results have been written to {os.path.join(output_folder, METADATA_FOLDER)}")
+
+    # --- Exports run in a worker thread, and report to the GUI through a queue
+    export_control = None  # ExportControl of the running export, None if no export is running
+
+    def start_export(export, plan, progress_bar, progress_label, pause_bt, cancel_bt):
+        """
+        Runs export(on_progress=..., control=...) in a worker thread. The window stays responsive :
+        progress events are put in a queue, read every 200 ms with root.after.
+        """
+        nonlocal export_control
+        if export_control is not None:
+            progress_label.config(text="An export is already running")
+            return
+        control = export_control = ExportControl()
+        events = queue.Queue()
+        start_time = datetime.now()
+        report = start_run_report()
+
+        def worker():
+            try:
+                events.put(('done', export(on_progress=lambda progress: events.put(('progress', progress)), control=control)))
+            except Exception as e:
+                logging.error(f"Export failed: {e}")
+                events.put(('error', e))
+
+        def poll():
+            nonlocal export_control
+            # Only the last event matters
+            event = None
+            while not events.empty():
+                event = events.get_nowait()
+                if event[0] != 'progress':
+                    break
+            if event is None or event[0] == 'progress':
+                if event is not None:
+                    progress = event[1]
+                    progress_bar['value'] = progress.percentage
+                    eta = progress.eta()
+                    progress_label.config(text=f"Exported {progress.processed}/{progress.total} files. Remaining : {format_duration(eta) if eta is not None else '...'}{' (paused)' if control.paused else ''}")
+                root.after(200, poll)
+                return
+
+            # --- Export finished
+            export_control = None
+            pause_bt.config(state=tk.DISABLED, text="Pause")
+            cancel_bt.config(state=tk.DISABLED)
+            duration = datetime.now() - start_time
+            if event[0] == 'error':
+                progress_label.config(text=f"Export failed : {event[1]}. Check 'export_errors.log' for details.")
+                return
+            progress = event[1]
+            try:
+                report.write(output_folder)
+            except OSError as e:
+                logging.error(f"Could not write the run report: {e}")
+            # Ensure progress bar reaches 100% at the end
+            progress_bar['value'] = 100 if not control.cancelled else progress.percentage
+            # Update progress label based on whether an error occurred
+            status = "Export Cancelled" if control.cancelled else "Export Done"
+            unchanged_text = f" {progress.unchanged} unchanged file(s) skipped." if progress.unchanged else ""
+            if progress.deduplicated:
+                unchanged_text += f" {progress.deduplicated} duplicate file(s) stored once."
+            if progress.skipped:
+                unchanged_text += f" {progress.skipped} file(s) skipped (failed in previous runs)."
+            if progress.failed:
+                progress_label.config(text=f"{status} with errors! Duration: {format_duration(duration.total_seconds())}.{unchanged_text} Check 'export_errors.log' for details.")
+            else:
+                progress_label.config(text=f"{status}! Duration: {format_duration(duration.total_seconds())}.{unchanged_text}")
+
+        # Init progressBar
+        progress_label.config(text=f"Exporting {plan.describe()}...")
+        progress_bar['value'] = 0  # Reset the progress bar
+        pause_bt.config(state=tk.NORMAL, text="Pause")
+        cancel_bt.config(state=tk.NORMAL)
+        threading.Thread(target=worker, name='export', daemon=True).start()
+        root.after(200, poll)
+
+    def on_pause(pause_bt):
+        if export_control is None:
+            return
+        if export_control.paused:
+            export_control.resume()
+            pause_bt.config(text="Pause")
+        else:
+            export_control.pause()
+            pause_bt.config(text="Resume")
+
+    def on_cancel():
+        if export_control is not None:
+            export_control.cancel()
+
+    def on_export_views():
+        # Get selected values
+        selected_exporters = [VALID_EXPORTERS[i] for i, var in enumerate(exporter_vars) if var.get()]
+        selected_languages = [VALID_LANGUAGES[i] for i, var in enumerate(lang_vars) if var.get()]
+
+        # check if a format is selected
+        if not selected_exporters :
+            export_progress_bar_lb.config(text="Please select format")
+            return
+
+        # If views are selected, only export these views. Else filter views by the selected languages
+        if selected_view_ids:
+            filtered_views = [catalogue.views_by_id[view_id] for view_id in selected_view_ids if view_id in catalogue.views_by_id]
+        else :
+            filtered_views = catalogue.select(languages=selected_languages)
+        incremental = incremental_var.get()
+        plan = plan_views_export(filtered_views, selected_exporters, output_folder, incremental=incremental)
+        start_export(
+            lambda on_progress, control: export_views(filtered_views, selected_exporters, output_folder, incremental=incremental, on_progress=on_progress, control=control, plan=plan),
+            plan,
+            export_progress_bar, export_progress_bar_lb, export_pause_bt, export_cancel_bt,
+        )
+
+    def on_export_all_views():
+        incremental = export_all_incremental_var.get()
+        deduplicate = export_all_dedup_var.get()
+        views = catalogue.views
+        plan = plan_views_export(views, VALID_EXPORTERS, output_folder, incremental=incremental)
+        # Hours of downloads : confirm first, with the estimate
+        if not messagebox.askokcancel("Export ALL views", f"{plan.describe()}. Continue ?"):
+            return
+        start_export(
+            lambda on_progress, control: export_all_views(views, output_folder, incremental=incremental, on_progress=on_progress, control=control, deduplicate=deduplicate, plan=plan),
+            plan,
+            export_all_progress_bar, export_all_progress_bar_lb, export_all_pause_bt, export_all_cancel_bt,
+        )
+
+    # --- Views selector : the listbox shows displayed_view_ids, the selection is kept by view id
+    # (views may share a name), also for the views hidden by the search
+    displayed_view_ids = []
+    selected_view_ids = set()
+    search_after_id = None  # Pending root.after of the debounced search
+
+    def update_views_listbox():
+        nonlocal displayed_view_ids, search_after_id
+        search_after_id = None
+        # Get selected values
+        selected_languages = [VALID_LANGUAGES[i] for i, var in enumerate(lang_vars) if var.get()]
+        # Views of the selected languages (all if none) matching the search, sorted alphabetically by name
+        views = catalogue.search(search_var.get(), selected_languages or None)
+        new_ids = [view.id for view in views]
+        new_id_set = set(new_ids)
+        # Minimal diff : both lists are in the same order. Remove the views that disappear
+        # (by runs, from the end so positions stay valid), then insert the new ones (by runs)
+        old_ids = displayed_view_ids
+        position = len(old_ids)
+        while position > 0:
+            position -= 1
+            if old_ids[position] not in new_id_set:
+                end = position
+                while position > 0 and old_ids[position - 1] not in new_id_set:
+                    position -= 1
+                views_listbox.delete(position, end)
+        old_id_set = set(old_ids)
+        position = 0
+        while position < len(new_ids):
+            if new_ids[position] in old_id_set:
+                position += 1
+                continue
+            start = position
+            while position < len(new_ids) and new_ids[position] not in old_id_set:
+                position += 1
+            views_listbox.insert(start, *[f"{view.name} ({view.locale})" for view in views[start:position]])
+            for index in range(start, position):
+                if new_ids[index] in selected_view_ids:
+                    views_listbox.selection_set(index)
+        displayed_view_ids = new_ids
+        update_views_count()
+
+    def on_search_change(*args):
+        # Debounce : filter once typing pauses, not on every keystroke
+        nonlocal search_after_id
+        if search_after_id is not None:
+            root.after_cancel(search_after_id)
+        search_after_id = root.after(SEARCH_DEBOUNCE, update_views_listbox)
+
+    def on_views_select(event):
+        selected_positions = set(views_listbox.curselection())
+        for position, view_id in enumerate(displayed_view_ids):
+            if position in selected_positions:
+                selected_view_ids.add(view_id)
+            else:
+                selected_view_ids.discard(view_id)
+        update_views_count()
+
+    def on_clear_selection():
+        selected_view_ids.clear()
+        views_listbox.selection_clear(0, tk.END)
+        update_views_count()
+
+    def update_views_count():
+        views_count_lb.config(text=f"{len(displayed_view_ids)} view(s) shown, {len(selected_view_ids)} selected")
+
+    # ===============================================================
+    # Init Window
+    # ===============================================================
+    root = tk.Tk()
+    root.title("StatBel_OpenDatasets")
+    root.state('zoomed')  # This will maximize the window
+    # Set the window to fullscreen
+    #root.attributes('-fullscreen', True)
+    #root.bind("<Escape>", lambda event: root.attributes('-fullscreen', False))
+    # Create a Notebook widget
+    notebook = ttk.Notebook(root)
+    notebook.pack(fill='both', expand=True)
+    style = ttk.Style()
+    style.configure(
+        'TNotebook.Tab',
+        font=('Arial', 16, 'bold'),
+        padding=(20, 10),
+        borderwidth=21,
+        relief='solid',
+        background='lightblue',
+        foreground='black',
+        highlightthickness=10,
+        highlightcolor='red',
+        highlightbackground='gray'
+    )
+
+    # ===============================================================
+    # Tab 0 : ReadMe/About
+    # ===============================================================
+    # Create my tab
+    tab0 = ttk.Frame(notebook)
+    notebook.add(tab0, text='About' )
+
+    # Adding a Text widget to ReadMe_frame
+    text_widget_tab0 = tk.Text(tab0, wrap='word' , bg=style.lookup("TFrame", "background"), fg='Black', bd=0)
+    # Text
+    Text_tab0 = """
+    StatBel Open Datasets Tool
+
+    This tool allows you to retrieve and export datasets from the Belgian Statistical Office's StatBel API in various formats.
+
+    Key Features:
+    - Export Metadata: Retrieve information about available datasets.
+    - Export All Views: Download all datasets (all languages) in selected formats (XML, JSON, CSV, XLS, HTML, PDF).
+    - Export Specific Views: 
+        Filtered by Language: French, English, Dutch, or German.
+        Individually selected.
+        In selected format.
+
+    Usage:
+    1. Export Metadata: Click "Export Metadata" to generate a text file with dataset information.
+    2. Export Views: In the "Export Views" tab, select formats and languages, then click "Export Views" to download your data.
+
+    Author: Ronaf-Git
+    For more information, visit: https://github.com/Ronaf-git/StatBel_OpenDatasets
+"""
+    text_widget_tab0.insert(tk.END,Text_tab0) 
+    # Set the Text widget to "disabled" to make it unwritable
+    text_widget_tab0.config(state=tk.DISABLED)
+    text_widget_tab0.bind("<FocusIn>", lambda e: text_widget_tab0.config(state=tk.DISABLED))
+    # pack it
+    text_widget_tab0.pack(fill="both", expand=True)
+
+
+    # --- Tabs 1 to 3 : added empty and disabled until the catalogue is loaded, then built the
+    # first time they are shown (see on_tab_changed)
+    tab1 = ttk.Frame(notebook)
+    notebook.add(tab1, text='Metadata', state='disabled')
+    tab2 = ttk.Frame(notebook)
+    notebook.add(tab2, text='Export All Views', state='disabled')
+    tab3 = ttk.Frame(notebook)
+    notebook.add(tab3, text='Export selected views', state='disabled')
+    # Widgets used by the buttons actions, set by the tab builders
+    metadata_lb = metadatalk_lb = metadata_files_lb = None
+    export_all_incremental_var = export_all_dedup_var = None
+    export_all_progress_bar = export_all_progress_bar_lb = export_all_pause_bt = export_all_cancel_bt = None
+    exporter_vars = lang_vars = search_var = views_listbox = views_count_lb = incremental_var = None
+    export_progress_bar = export_progress_bar_lb = export_pause_bt = export_cancel_bt = None
+
+    # ==============================================================================================================================
+    # Tab 1 : Get Metadatas
+    # ==============================================================================================================================
+    def build_metadata_tab():
+        nonlocal metadata_lb, metadatalk_lb, metadata_files_lb
+        # --- metadata : button and label
+        # Create Button 
+        metadata_bt = tk.Button(tab1, text="Export metadata", command=on_create_metadata)
+        metadata_bt.grid(row=1, column=0, sticky="nsew", padx=10, pady=10)
+        # Create Label 
+        metadata_lb = tk.Label(tab1, text="Export metadata (Datasources and views) in a texte file", font=("Helvetica", 14, "bold"))
+        metadata_lb.grid(row=0, column=0, sticky="nsew", padx=10, pady=5)
+
+        # --- relationnal link between datasources and views : button and label
+        # Create Button 
+        metadatalk_bt = tk.Button(tab1, text="Export relationnal metadata", command=on_create_linked_views_metadata)
+        metadatalk_bt.grid(row=3, column=0, sticky="nsew", padx=10, pady=10)
+        # Create Label 
+        metadatalk_lb = tk.Label(tab1, text="Show relations between datasources and views", font=("Helvetica", 14, "bold"))
+        metadatalk_lb.grid(row=2, column=0, sticky="nsew", padx=10, pady=5)
+
+        # --- machine readable metadata (NDJSON, CSV, SQLite) : button and label
+        # Create Button
+        metadata_files_bt = tk.Button(tab1, text="Export metadata files", command=on_export_metadata_files)
+        metadata_files_bt.grid(row=5, column=0, sticky="nsew", padx=10, pady=10)
+        # Create Label
+        metadata_files_lb = tk.Label(tab1, text="Export datasources, views and their relations as NDJSON, CSV and SQLite", font=("Helvetica", 14, "bold"))
+        metadata_files_lb.grid(row=4, column=0, sticky="nsew", padx=10, pady=5)
+
+    # ===============================================================================================================
+    # Tab 2 : All datas
+    # ===============================================================================================================
+    def build_export_all_tab():
+        nonlocal export_all_incremental_var, export_all_dedup_var
+        nonlocal export_all_progress_bar, export_all_progress_bar_lb, export_all_pause_bt, export_all_cancel_bt
+        # --- export ALL views : button and label
+        # Create Button 
+        export_all_bt = tk.Button(tab2, text="Export ALL views", command=on_export_all_views)
+        export_all_bt.grid(row=3, column=0, sticky="nsew", padx=10, pady=10)
+        # Create Label 
+        export_all_lb = tk.Label(tab2, text="Export all views (all languages/format). Will be long.", font=("Helvetica", 14, "bold"))
+        export_all_lb.grid(row=2, column=0, sticky="nsew", padx=10, pady=5)
+        # --- Incremental sync : checkbutton
+        export_all_incremental_var = tk.BooleanVar(value=False)
+        export_all_incremental_cb = tk.Checkbutton(tab2, text="Incremental : only download files that changed since the last export, delete removed views", variable=export_all_incremental_var, font=("Helvetica", 12))
+        export_all_incremental_cb.grid(row=4, column=0, sticky="w", padx=10, pady=5)
+        # --- Deduplication : checkbutton
+        export_all_dedup_var = tk.BooleanVar(value=False)
+        export_all_dedup_cb = tk.Checkbutton(tab2, text="Deduplicate : store identical files once (hardlinks)", variable=export_all_dedup_var, font=("Helvetica", 12))
+        export_all_dedup_cb.grid(row=5, column=0, sticky="w", padx=10, pady=5)
+        # ---  Progressbar, pause and cancel buttons
+        export_all_progress_bar = ttk.Progressbar(tab2, length=300, mode='determinate')
+        export_all_progress_bar.grid(row=6, column=0, sticky="nsew", padx=10, pady=10)
+        export_all_progress_bar_lb = tk.Label(tab2, text="ProgressBar Statut...")
+        export_all_progress_bar_lb.grid(row=7, column=0, sticky="nsew", padx=10, pady=5)
+        export_all_control_frame = tk.Frame(tab2)
+        export_all_control_frame.grid(row=8, column=0, sticky="w", padx=10, pady=5)
+        export_all_pause_bt = tk.Button(export_all_control_frame, text="Pause", state=tk.DISABLED, command=lambda: on_pause(export_all_pause_bt))
+        export_all_pause_bt.grid(row=0, column=0, padx=5)
+        export_all_cancel_bt = tk.Button(export_all_control_frame, text="Cancel", state=tk.DISABLED, command=on_cancel)
+        export_all_cancel_bt.grid(row=0, column=1, padx=5)
+
+    # ===============================================================================================================
+    # Tab 3 : dédicated Views
+    # ===============================================================================================================
+    def build_export_views_tab():
+        nonlocal exporter_vars, lang_vars, search_var, views_listbox, views_count_lb, incremental_var
+        nonlocal export_progress_bar, export_progress_bar_lb, export_pause_bt, export_cancel_bt
+
+        # Configure the grid to allow widgets to expand properly
+        for i in range(20):
+            tab3.grid_rowconfigure(i, weight=1)
+        for i in range(0):
+            tab3.grid_columnconfigure(i, weight=1)
+
+        # --- Exporters : Checkbuttons and label
+        # Create Label
+        exporters_lb = tk.Label(tab3, text="Format selector", font=("Helvetica", 14, "bold"))
+        exporters_lb.grid(row=0, column=2, sticky="nsew", padx=10, pady=5)
+        # Frame to contain all Exporter Checkbuttons (for horizontal layout)
+        exporters_frame = tk.Frame(tab3)
+        exporters_frame.grid(row=1, column=2, sticky="nsew", padx=10, pady=5)
+        # Variables to track selected exporters
+        exporter_vars = []
+        for item in VALID_EXPORTERS:
+            exporter_vars.append(tk.BooleanVar(value=False))  # Each variable tracks if it's selected
+        # Create Checkbuttons for each exporter inside the exporters_frame (horizontal layout)
+        for idx, (item, var) in enumerate(zip(VALID_EXPORTERS, exporter_vars)):
+            cb = tk.Checkbutton(exporters_frame, text=item, variable=var, font=("Helvetica", 12))
+            cb.grid(row=0, column=idx, sticky="w", padx=10, pady=5)  # All checkbuttons in row 0, columns 0,1,2...
+
+        # --- Lang : Checkbuttons and label
+        # Create Label
+        Lang_lb = tk.Label(tab3, text="Language selector", font=("Helvetica", 14, "bold"))
+        Lang_lb.grid(row=2, column=2, sticky="nsew", padx=10, pady=5)
+        # Frame to contain all Language Checkbuttons (for horizontal layout)
+        lang_frame = tk.Frame(tab3)
+        lang_frame.grid(row=3, column=2, sticky="nsew", padx=10, pady=5)
+        # Variables to track selected languages
+        lang_vars = []
+        for item in VALID_LANGUAGES:
+            lang_vars.append(tk.BooleanVar(value=False))  # Each variable tracks if it's selected
+        # Create Checkbuttons for each language inside the lang_frame (horizontal layout)
+        for idx, (item, var) in enumerate(zip(VALID_LANGUAGES, lang_vars)):
+            cb = tk.Checkbutton(lang_frame, text=item, variable=var, font=("Helvetica", 12), command=update_views_listbox)
+            cb.grid(row=0, column=idx, sticky="w", padx=10, pady=5)  # All checkbuttons in row 0, columns 0,1,2...
+
+
+        # --- dedicated views : listbow and label
+        # Create Label
+        views_lb = tk.Label(tab3, text="Views selector - Will restrain the export to these views", font=("Helvetica", 14, "bold"))
+        views_lb.grid(row=4, column=2, sticky="nsew", padx=10, pady=5)
+        # Create a Frame to contain the search box, the Listbox and Scrollbar
+        views_frame = tk.Frame(tab3)
+        views_frame.grid(row=5, column=2, padx=10, pady=10)  # Grid row 5, col 2
+        # Search box : words of the view or datasource names, filtered as you type
+        search_frame = tk.Frame(views_frame)
+        search_frame.grid(row=0, column=0, columnspan=2, sticky="ew", pady=5)
+        tk.Label(search_frame, text="Search :", font=("Helvetica", 12)).grid(row=0, column=0, sticky="w")
+        search_var = tk.StringVar()
+        search_var.trace_add('write', on_search_change)
+        search_entry = tk.Entry(search_frame, textvariable=search_var, width=60)
+        search_entry.grid(row=0, column=1, sticky="w", padx=5)
+        # Create the Listbox widget with MULTIPLE selection mode
+        views_listbox = tk.Listbox(views_frame, selectmode=tk.MULTIPLE, height=10, width=150, exportselection=False)  # Set height to show only 10 items at once
+        views_listbox.bind('<<ListboxSelect>>', on_views_select)
+        # Create the Scrollbar widget
+        views_scrollbar = tk.Scrollbar(views_frame, orient=tk.VERTICAL, command=views_listbox.yview)
+        views_scrollbar.grid(row=1, column=1, sticky="ns")  # Place the scrollbar in column 1 of the frame
+        # Attach the scrollbar to the Listbox
+        views_listbox.config(yscrollcommand=views_scrollbar.set)
+        # Pack the Listbox inside the frame
+        views_listbox.grid(row=1, column=0, sticky="nsew")  # Make the listbox fill the frame
+        # Number of views shown/selected, and button to clear the selection
+        views_count_frame = tk.Frame(views_frame)
+        views_count_frame.grid(row=2, column=0, columnspan=2, sticky="ew", pady=5)
+        views_count_lb = tk.Label(views_count_frame, text="", font=("Helvetica", 12))
+        views_count_lb.grid(row=0, column=0, sticky="w")
+        clear_selection_bt = tk.Button(views_count_frame, text="Clear selection", command=on_clear_selection)
+        clear_selection_bt.grid(row=0, column=1, sticky="w", padx=10)
+        # Configure the frame to expand and fill the space
+        views_frame.grid_rowconfigure(1, weight=1)
+        views_frame.grid_columnconfigure(0, weight=1)
+        # Views of the selected languages (all views if none), sorted alphabetically by name
+        update_views_listbox()
+
+        # --- Incremental sync : checkbutton
+        incremental_var = tk.BooleanVar(value=False)
+        incremental_cb = tk.Checkbutton(tab3, text="Incremental : only download files that changed since the last export", variable=incremental_var, font=("Helvetica", 12))
+        incremental_cb.grid(row=8, column=2, sticky="w", padx=10, pady=5)
+
+        # --- export : button, label and progressbarr
+        # Create Button 
+        export_bt = tk.Button(tab3, text="Export views", command=on_export_views)
+        export_bt.grid(row=10, column=2, sticky="nsew", padx=10, pady=10)
+        # Create Label 
+        export_lb = tk.Label(tab3, text="Export all available views in selected language and format. If specific views are selected, only those will be exported.", font=("Helvetica", 14, "bold"))
+        export_lb.grid(row=9, column=2, sticky="nsew", padx=10, pady=5)
+        # ---  Progressbar
+        # Create the progress bar
+        export_progress_bar = ttk.Progressbar(tab3, length=300, mode='determinate')
+        export_progress_bar.grid(row=11, column=2, sticky="nsew", padx=10, pady=10)
+        # Create Label 
+        export_progress_bar_lb = tk.Label(tab3, text="ProgressBar Statut...")
+        export_progress_bar_lb.grid(row=12, column=2, sticky="nsew", padx=10, pady=5)
+        # --- Pause and cancel buttons
+        export_control_frame = tk.Frame(tab3)
+        export_control_frame.grid(row=13, column=2, sticky="w", padx=10, pady=5)
+        export_pause_bt = tk.Button(export_control_frame, text="Pause", state=tk.DISABLED, command=lambda: on_pause(export_pause_bt))
+        export_pause_bt.grid(row=0, column=0, padx=5)
+        export_cancel_bt = tk.Button(export_control_frame, text="Cancel", state=tk.DISABLED, command=on_cancel)
+        export_cancel_bt.grid(row=0, column=1, padx=5)
+
+    # ===============================================================
+    # Tabs built on first activation, catalogue loaded in the background
+    # ===============================================================
+    tab_builders = {1: build_metadata_tab, 2: build_export_all_tab, 3: build_export_views_tab}
+
+    def on_tab_changed(event=None):
+        # Build the shown tab the first time, once the catalogue is loaded
+        index = notebook.index(notebook.select())
+        if catalogue is not None and index in tab_builders:
+            tab_builders.pop(index)()
+
+    notebook.bind('<<NotebookTabChanged>>', on_tab_changed)
+
+    # --- Loading state, shown until the catalogue is loaded
+    loading_frame = ttk.Frame(root)
+    loading_frame.pack(side='bottom', fill='x')
+    loading_lb = ttk.Label(loading_frame, text="Loading datasources and views...")
+    loading_lb.pack(side='left', padx=10, pady=5)
+    loading_bar = ttk.Progressbar(loading_frame, length=200, mode='indeterminate')
+    loading_bar.pack(side='left', padx=10, pady=5)
+    loading_bar.start(20)
+
+    def load_catalogue_in_background():
+        """
+        Loads the catalogue in a worker thread : the cache is read (or the API fetched) while the
+        window is already shown. The result is read every 100 ms with root.after, like exports.
+        """
+        events = queue.Queue()
+
+        def worker():
+            try:
+                # cache_ttl 0 (--refresh-catalogue) : fetched now, not served stale
+                loaded = load_catalogue(output_folder, cache_ttl, stale_while_revalidate=cache_ttl > 0, on_refresh=on_catalogue_refresh)
+            except Exception as e:
+                logging.error(f"Could not load the catalogue: {e}")
+                loaded = None
+            events.put(loaded)
+            # Search index of the views selector, built before it is needed
+            if loaded is not None:
+                loaded.build_search_index()
+
+        def poll():
+            nonlocal catalogue, load_failed
+            try:
+                loaded = events.get_nowait()
+            except queue.Empty:
+                root.after(100, poll)
+                return
+            loading_bar.stop()
+            loading_frame.destroy()
+            # if cannont get data : stop script
+            if loaded is None:
+                messagebox.showerror("Error", f"Datasources or Views data is missing. Please check the logfile ({output_folder})", parent=root)
+                load_failed = True
+                root.destroy()
+                return
+            # A background refresh may have finished first : keep the newest catalogue
+            if catalogue is None:
+                catalogue = loaded
+            for index in tab_builders:
+                notebook.tab(index, state='normal')
+            on_tab_changed()
+
+        threading.Thread(target=worker, name='catalogue', daemon=True).start()
+        root.after(100, poll)
+
+    load_failed = False
+    load_catalogue_in_background()
+    root.mainloop()
+    if load_failed:
+        sys.exit(1)  # Stop the script
+
+
+if __name__ == "__main__":
+    # Shard processes of the frozen exe (pyinstaller) start here : run them instead of main
+    import multiprocessing
+    multiprocessing.freeze_support()
+    sys.exit(main())
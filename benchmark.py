@@ -0,0 +1,325 @@
+# ----------------------------------------------------
+# -- Projet : StatBel_OpenDatasets
+# -- Author : Ronaf - https://github.com/Ronaf-git
+# -- Usage : Benchmark the export path against a local mock of the StatBel API
+#            python benchmark.py --views 10000 --latency 0.01 --formats CSV,JSON
+# ----------------------------------------------------
+# Each benchmark runs in a fresh Python process, so startup time and peak memory
+# are measured independently. The mock API runs in this (parent) process.
+
+# ===============================================================
+# Imports
+# ===============================================================
+import argparse
+import gzip
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BENCHMARKS = ['startup', 'catalogue', 'create_metadata', 'create_linked_views_metadata', 'export_metadata',
+              'export_views', 'export_views_incremental', 'export_views_dedup', 'export_views_gzip',
+              'export_views_sharded', 'export_all_views']
+LOCALES = ['fr', 'nl', 'en', 'de']
+
+# ===============================================================
+# Mock StatBel API
+# ===============================================================
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # Default 5 : concurrent clients (async backend) would wait for SYN retries
+
+
+class MockStatBelAPI:
+    """
+    Local stand-in for the StatBel API, serving a synthetic catalogue.
+
+    Serves /datasources, /views and /views/{id}/result/{format} under `url`. Results
+    support ETag/If-None-Match, so incremental exports can be measured too, and are sent
+    gzip encoded to clients accepting it.
+
+    Args:
+        views (int): Number of views. Views come in the 4 locales : names are shared by 4 views.
+        datasources (int): Number of datasources. Views are spread evenly across them.
+        latency (float): Seconds to wait before answering each request.
+        error_rate (float): Fraction of result requests answered with a 500 error.
+        payload_size (int): Size in bytes of each result file.
+    """
+    def __init__(self, views=1000, datasources=100, latency=0.0, error_rate=0.0, payload_size=2048):
+        self.latency = latency
+        self.error_rate = error_rate
+        # A valid CSV of about payload_size bytes (whole rows)
+        self.payload = b"Year;Region;Value\n" + b"2024;Brussels;12345\n" * max(1, (payload_size - 18) // 20)
+        self.gzip_payload = gzip.compress(self.payload)
+        self.datasources_json = json.dumps([
+            {'id': i, 'name': f"Datasource {i}", 'description': {'fr': f"Source {i}", 'nl': f"Bron {i}"}}
+            for i in range(datasources)
+        ]).encode()
+        self.views_json = json.dumps([
+            {'id': i, 'name': f"View {i // len(LOCALES)} - {LOCALES[i % len(LOCALES)]}", 'locale': LOCALES[i % len(LOCALES)],
+             'dataSourceId': i % max(1, datasources)}
+            for i in range(views)
+        ]).encode()
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.server = MockServer(('127.0.0.1', 0), self.handler())
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/bestat/api"
+
+    def handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive, like the real API
+            # Headers and body are separate writes : without TCP_NODELAY, Nagle and delayed ACKs
+            # add about 40 ms to each request on a kept-alive connection
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def send(self, status, body=b'', headers=None):
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                with api._lock:
+                    api.requests += 1
+                if api.latency:
+                    time.sleep(api.latency)
+                path = self.path.split('?')[0]
+                if path.endswith('/datasources'):
+                    return self.send(200, api.datasources_json, {'Content-Type': 'application/json'})
+                if path.endswith('/views'):
+                    return self.send(200, api.views_json, {'Content-Type': 'application/json'})
+                match = re.search(r'/views/(\d+)/result/(\w+)$', path)
+                if not match:
+                    return self.send(404)
+                if api.error_rate and random.random() < api.error_rate:
+                    return self.send(500)
+                etag = f'"{match.group(1)}-{match.group(2)}"'
+                if self.headers.get('If-None-Match') == etag:
+                    return self.send(304, headers={'ETag': etag})
+                if 'gzip' in self.headers.get('Accept-Encoding', ''):
+                    return self.send(200, api.gzip_payload, {'ETag': etag, 'Content-Encoding': 'gzip'})
+                self.send(200, api.payload, {'ETag': etag})
+
+        return Handler
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, name='mock-api', daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+# ===============================================================
+# Benchmarks (run in a child process)
+# ===============================================================
+def peak_rss_mb():
+    # Peak memory of this process. None where the resource module doesn't exist (Windows)
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def disk_usage(folders):
+    # Bytes used by the files of some folders, hardlinked files counted once
+    seen = set()
+    total = 0
+    for root, _, files in (walked for folder in folders for walked in os.walk(folder)):
+        for filename in files:
+            stat = os.stat(os.path.join(root, filename))
+            if (stat.st_dev, stat.st_ino) not in seen:
+                seen.add((stat.st_dev, stat.st_ino))
+                total += stat.st_size
+    return total
+
+def run_benchmark(name, api_url, output_folder, formats, jobs, backend='threads'):
+    """
+    Runs one benchmark in this process.
+
+    Returns:
+        dict: The measures of the benchmark.
+    """
+    start = time.perf_counter()
+    sys.path.insert(0, SCRIPT_DIR)
+    import StatBel_OpenDatasets as statbel
+    result = {'import_seconds': round(time.perf_counter() - start, 4)}
+    statbel.API_URL = api_url
+    statbel.init_output_folder(output_folder)
+
+    if name == 'catalogue':
+        start = time.perf_counter()
+        catalogue = statbel.load_catalogue(output_folder)
+        result['cold_seconds'] = round(time.perf_counter() - start, 4)
+        start = time.perf_counter()
+        catalogue = statbel.load_catalogue(output_folder)
+        result['warm_seconds'] = round(time.perf_counter() - start, 4)
+        result['views'] = len(catalogue.views)
+    else:
+        # The catalogue is not part of the measure
+        catalogue = statbel.load_catalogue(output_folder)
+        if name == 'export_views_incremental':
+            # First run fills the manifest, the second one is measured
+            statbel.export_views(catalogue.views, formats, output_folder, jobs, incremental=True, backend=backend)
+        start = time.perf_counter()
+        if name == 'create_metadata':
+            statbel.create_metadata(catalogue, output_folder)
+        elif name == 'create_linked_views_metadata':
+            statbel.create_linked_views_metadata(catalogue, output_folder)
+        elif name == 'export_metadata':
+            statbel.export_metadata(catalogue, output_folder, ['ndjson', 'csv', 'sqlite'])
+        elif name in ('export_views', 'export_views_incremental', 'export_views_dedup', 'export_views_gzip'):
+            progress = statbel.export_views(catalogue.views, formats, output_folder, jobs, incremental=(name == 'export_views_incremental'),
+                                            deduplicate=(name == 'export_views_dedup'), backend=backend,
+                                            compression='gzip' if name == 'export_views_gzip' else None)
+        elif name == 'export_views_sharded':
+            # One shard per core (at least 2), each with `jobs` downloads
+            progress = statbel.export_sharded(catalogue.views, formats, output_folder, max(2, os.cpu_count() or 1), jobs, backend=backend)
+        elif name == 'export_all_views':
+            progress = statbel.export_all_views(catalogue.views, output_folder, jobs, backend=backend)
+        seconds = time.perf_counter() - start
+        result['seconds'] = round(seconds, 4)
+        if name.startswith('export_views') or name == 'export_all_views':
+            result.update({
+                'files': progress.done,
+                'unchanged': progress.unchanged,
+                'failed': progress.failed,
+                'files_per_sec': round(progress.processed / seconds, 1) if seconds else None,
+                'bytes_per_sec': round(progress.bytes / seconds) if seconds else None,
+                'deduplicated': progress.deduplicated,
+                'disk_bytes': disk_usage(os.path.join(output_folder, folder) for folder in statbel.VALID_EXPORTERS + [statbel.BLOBS_FOLDER]),
+            })
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+# Modules that must not be imported at startup : imported by the functions that need them
+STARTUP_LAZY_MODULES = ['requests', 'urllib3', 'asyncio', 'sqlite3', 'multiprocessing', 'tkinter', 'aiohttp', 'pyarrow', 'zstandard']
+# Launch up to the GUI/command : import the module and parse the command line. Prints the lazy modules imported
+STARTUP_CODE = (
+    "import json, sys; before = set(sys.modules); import StatBel_OpenDatasets; StatBel_OpenDatasets.build_parser().parse_args([]); "
+    f"print(json.dumps(sorted(name for name in {STARTUP_LAZY_MODULES!r} if name in sys.modules and name not in before)))"
+)
+
+def time_launch(code, cwd):
+    # Seconds to run `code` in a fresh interpreter, and its last output line
+    start = time.perf_counter()
+    child = subprocess.run([sys.executable, '-c', code], cwd=cwd, check=True, capture_output=True, text=True)
+    return time.perf_counter() - start, child.stdout.strip().splitlines()[-1] if child.stdout.strip() else None
+
+def measure_startup(repeat):
+    """
+    Launch time in a fresh interpreter (no network, no GUI expected), from a copy of the script :
+    cold : first launch, the module is compiled (no __pycache__), warm : launches with the bytecode cached.
+    'interpreter' is the launch time of an empty Python, to tell the module's own share.
+    'lazy_modules_imported' should stay empty : these modules are imported by the functions that need them.
+    """
+    folder = tempfile.mkdtemp(prefix='statbel_startup_')
+    try:
+        shutil.copy(os.path.join(SCRIPT_DIR, 'StatBel_OpenDatasets.py'), folder)
+        cold, warm, interpreter = [], [], []
+        for _ in range(repeat):
+            shutil.rmtree(os.path.join(folder, '__pycache__'), ignore_errors=True)
+            cold.append(time_launch(STARTUP_CODE, folder)[0])
+        for _ in range(repeat):
+            seconds, imported = time_launch(STARTUP_CODE, folder)
+            warm.append(seconds)
+            interpreter.append(time_launch('pass', folder)[0])
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    result = {}
+    for name, durations in (('cold', cold), ('warm', warm), ('interpreter', interpreter)):
+        durations.sort()
+        result[f'{name}_min_seconds'] = round(durations[0], 4)
+        result[f'{name}_median_seconds'] = round(durations[len(durations) // 2], 4)
+    result['lazy_modules_imported'] = json.loads(imported)
+    return result
+
+# ===============================================================
+# Main
+# ===============================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark StatBel_OpenDatasets against a local mock API.")
+    parser.add_argument('--views', type=int, default=1000, help="Number of views in the mock catalogue (default : 1000)")
+    parser.add_argument('--datasources', type=int, default=100, help="Number of datasources (default : 100)")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds of latency per request (default : 0)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of result requests failing with 500 (default : 0)")
+    parser.add_argument('--payload-size', type=int, default=2048, help="Bytes per exported file (default : 2048)")
+    parser.add_argument('--formats', default='CSV', help="Comma separated formats for export_views (default : CSV)")
+    parser.add_argument('--jobs', type=int, default=8, help="Parallel downloads (default : 8)")
+    parser.add_argument('--backend', choices=['threads', 'async'], default='threads', help="Download backend (default : threads)")
+    parser.add_argument('--repeat', type=int, default=5, help="Repetitions of the startup benchmark (default : 5)")
+    parser.add_argument('--max-startup', type=float,
+                        help="Fail (exit code 1) if the warm startup median exceeds these seconds, or if a lazy module is imported at startup")
+    parser.add_argument('--benchmarks', default=','.join(b for b in BENCHMARKS if b != 'export_all_views'),
+                        help=f"Comma separated benchmarks among {','.join(BENCHMARKS)} (default : all but export_all_views)")
+    parser.add_argument('--json', help="Also write the results to this JSON file")
+    # Internal : run a single benchmark in a child process
+    parser.add_argument('--child', nargs=3, metavar=('NAME', 'API_URL', 'OUTPUT'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    formats = [item.strip().upper() for item in args.formats.split(',') if item.strip()]
+
+    if args.child:
+        name, api_url, output_folder = args.child
+        print(json.dumps(run_benchmark(name, api_url, output_folder, formats, args.jobs, args.backend)))
+        return 0
+
+    benchmarks = [item.strip() for item in args.benchmarks.split(',') if item.strip()]
+    unknown = [item for item in benchmarks if item not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s) {', '.join(unknown)}")
+
+    results = {'config': {key: value for key, value in vars(args).items() if key not in ('child', 'json')}}
+    regressions = []
+    with MockStatBelAPI(args.views, args.datasources, args.latency, args.error_rate, args.payload_size) as api:
+        for name in benchmarks:
+            if name == 'startup':
+                results[name] = measure_startup(args.repeat)
+                if args.max_startup is not None and results[name]['warm_median_seconds'] > args.max_startup:
+                    regressions.append(f"warm startup {results[name]['warm_median_seconds']}s > {args.max_startup}s")
+                if args.max_startup is not None and results[name]['lazy_modules_imported']:
+                    regressions.append(f"imported at startup : {', '.join(results[name]['lazy_modules_imported'])}")
+            else:
+                output_folder = tempfile.mkdtemp(prefix='statbel_bench_')
+                try:
+                    child = subprocess.run(
+                        [sys.executable, os.path.abspath(__file__), '--formats', ','.join(formats), '--jobs', str(args.jobs), '--backend', args.backend,
+                         '--child', name, api.url, output_folder],
+                        capture_output=True, text=True,
+                    )
+                finally:
+                    shutil.rmtree(output_folder, ignore_errors=True)
+                if child.returncode != 0:
+                    results[name] = {'error': child.stderr.strip().splitlines()[-1] if child.stderr.strip() else f"exit code {child.returncode}"}
+                else:
+                    results[name] = json.loads(child.stdout.strip().splitlines()[-1])
+            print(f"{name:<30} {json.dumps(results[name])}")
+        results['config']['requests_served'] = api.requests
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+    if regressions:
+        print(f"Startup regression : {'; '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
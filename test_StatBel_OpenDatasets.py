@@ -0,0 +1,262 @@
+# ----------------------------------------------------
+# -- Projet : StatBel_OpenDatasets
+# -- Author : Ronaf - https://github.com/Ronaf-git
+# -- Usage : Tests of the resumable downloads, the state files and the catalogue snapshots
+#            python -m pytest -q  (or python -m unittest test_StatBel_OpenDatasets)
+# ----------------------------------------------------
+# Downloads are tested against a local http.server, like the mock API of benchmark.py.
+# Nothing is sent to the real StatBel API.
+
+# ===============================================================
+# Imports
+# ===============================================================
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from requests.exceptions import ChunkedEncodingError
+
+import StatBel_OpenDatasets as statbel
+
+# ===============================================================
+# Local file server : Range/If-Range, and connections cut midway
+# ===============================================================
+class FileServer:
+    """
+    Serves `body` at /file with an ETag, and honours Range requests whose If-Range matches it.
+
+    Attributes:
+        body (bytes): The file. Changing it changes the ETag.
+        cut_after (int): If set, the next response is closed after this many bytes of the body.
+        requests (list of dict): Headers of the requests received.
+    """
+    def __init__(self, body):
+        self.body = body
+        self.cut_after = None
+        self.requests = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self.handler())
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/file"
+
+    @property
+    def etag(self):
+        return f'"{len(self.body)}-{hash(self.body) & 0xffffffff:x}"'
+
+    def handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                server.requests.append(dict(self.headers))
+                body, status, headers = server.body, 200, {'ETag': server.etag}
+                range_header = self.headers.get('Range')
+                if range_header and self.headers.get('If-Range', server.etag) == server.etag:
+                    start = int(range_header.split('=')[1].split('-')[0])
+                    headers['Content-Range'] = f"bytes {start}-{len(body) - 1}/{len(body)}"
+                    body, status = body[start:], 206
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if server.cut_after is not None:
+                    # Announced in full, only partly sent : the client sees a closed connection
+                    self.wfile.write(body[:server.cut_after])
+                    self.wfile.flush()
+                    server.cut_after = None
+                    self.close_connection = True
+                    return
+                self.wfile.write(body)
+
+        return Handler
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+# ===============================================================
+# Tests
+# ===============================================================
+class DownloadResumeTest(unittest.TestCase):
+    """download_file : interrupted downloads are kept in a .part file and resumed with Range/If-Range."""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.target = os.path.join(self.folder, 'View.CSV')
+        self.partial = self.target + statbel.PARTIAL_SUFFIX
+        self.body = b"Year;Region;Value\n" + b"2024;Brussels;12345\n" * 5000
+        self.api = FileServer(self.body)
+        self.api.__enter__()
+        self.addCleanup(self.api.__exit__)
+
+    def interrupted_download(self):
+        # One attempt, cut at a third of the file : the partial file (whole chunks) and its validator are kept
+        self.api.cut_after = len(self.body) // 3
+        with self.assertRaises((statbel.IncompleteDownloadError, ChunkedEncodingError)):
+            statbel.download_file(self.api.url, self.target, chunk_size=4096, retries=1)
+        self.assertFalse(os.path.exists(self.target))
+        self.assertEqual(os.path.getsize(self.partial), len(self.body) // 3 // 4096 * 4096)
+        self.assertEqual(statbel.read_validator(self.partial)['etag'], self.api.etag)
+        return os.path.getsize(self.partial)
+
+    def test_resumes_where_the_download_stopped(self):
+        offset = self.interrupted_download()
+        result = statbel.download_file(self.api.url, self.target, retries=1)
+        last_request = self.api.requests[-1]
+        self.assertEqual(last_request['Range'], f"bytes={offset}-")
+        self.assertEqual(last_request['If-Range'], self.api.etag)
+        with open(self.target, 'rb') as file:
+            self.assertEqual(file.read(), self.body)
+        self.assertEqual(result['size'], len(self.body))
+        self.assertEqual(result['sha256'], hashlib.sha256(self.body).hexdigest())
+        self.assertFalse(os.path.exists(self.partial))
+        self.assertFalse(os.path.exists(self.partial + '.json'))
+
+    def test_restarts_when_the_file_changed(self):
+        self.interrupted_download()
+        # If-Range doesn't match anymore : the whole new version is sent, the partial file is dropped
+        self.api.body = self.body.replace(b'12345', b'67890')
+        statbel.download_file(self.api.url, self.target, retries=1)
+        with open(self.target, 'rb') as file:
+            self.assertEqual(file.read(), self.api.body)
+        self.assertFalse(os.path.exists(self.partial))
+
+    def test_partial_file_without_validator_is_not_resumed(self):
+        with open(self.partial, 'wb') as file:
+            file.write(b'garbage')
+        statbel.download_file(self.api.url, self.target, retries=1)
+        self.assertNotIn('Range', self.api.requests[-1])
+        with open(self.target, 'rb') as file:
+            self.assertEqual(file.read(), self.body)
+
+
+def add_entries(path, prefix, count):
+    # Another run (process) adding entries to a state file, one save each
+    entries = statbel.load_state_file(path, 'test state')
+    for index in range(count):
+        entries[f"{prefix}-{index}"] = index
+        statbel.save_state_file(entries, path)
+
+
+class StateFileTest(unittest.TestCase):
+    """save_state_file : runs sharing an Output folder only apply their own changes, under a lock."""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.path = os.path.join(self.folder, 'state.json')
+
+    def read(self):
+        with open(self.path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+
+    def test_changes_of_another_run_are_kept(self):
+        statbel.save_state_file({'a': 1, 'b': 1, 'c': 1}, self.path)
+        entries = statbel.load_state_file(self.path, 'test state')
+        # Saved by another run in the meantime
+        with open(self.path, 'w', encoding='utf-8') as file:
+            json.dump({'a': 1, 'b': 2, 'c': 1, 'other': 1}, file)
+        entries['a'] = 2
+        del entries['c']
+        entries['new'] = 1
+        statbel.save_state_file(entries, self.path)
+        self.assertEqual(self.read(), {'a': 2, 'b': 2, 'other': 1, 'new': 1})
+        self.assertFalse(os.path.exists(self.path + '.lock'))
+
+    def test_stale_lock_is_taken_over(self):
+        with open(self.path + '.lock', 'w'):
+            pass
+        old = time.time() - statbel.STATE_LOCK_TIMEOUT - 1
+        os.utime(self.path + '.lock', (old, old))
+        statbel.save_state_file({'a': 1}, self.path)
+        self.assertEqual(self.read(), {'a': 1})
+        self.assertFalse(os.path.exists(self.path + '.lock'))
+
+    def test_concurrent_runs(self):
+        with ProcessPoolExecutor(max_workers=4) as executor:
+            for future in [executor.submit(add_entries, self.path, f"run{run}", 25) for run in range(4)]:
+                future.result()
+        self.assertEqual(len(self.read()), 100)
+
+
+class SnapshotTest(unittest.TestCase):
+    """Catalogue snapshots : diffs, and the views to export of each --changed-only filter."""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.datasources = [{'id': 1, 'name': "Population"}, {'id': 2, 'name': "Economy"}]
+        self.views = [{'id': i, 'name': f"View {i}", 'locale': 'fr' if i % 2 else 'nl', 'dataSourceId': 1 + i % 2} for i in range(6)]
+
+    def catalogue(self):
+        # Snapshots are named to the microsecond : never two in the same one
+        time.sleep(0.001)
+        return statbel.Catalogue(json.loads(json.dumps(self.datasources)), json.loads(json.dumps(self.views)))
+
+    def test_diff(self):
+        old = statbel.catalogue_records(self.catalogue())
+        self.views[0]['name'] = "Renamed"
+        self.views.pop()
+        self.views.append({'id': 10, 'name': "New", 'locale': 'fr', 'dataSourceId': 1})
+        self.datasources[1]['name'] = "Economy and finance"
+        catalogue = self.catalogue()
+        diff = statbel.diff_catalogues(old, statbel.catalogue_records(catalogue))
+        self.assertEqual([record['id'] for record in diff.added['views']], [10])
+        self.assertEqual([record['id'] for record in diff.removed['views']], [5])
+        self.assertEqual([(new['id'], fields) for _, new, fields in diff.changed['views']], [(0, {'name': ("View 0", "Renamed")})])
+        # Added, renamed, and the views of the changed datasource 2
+        self.assertEqual([view.id for view in diff.changed_views(catalogue)], [0, 1, 3, 10])
+        self.assertEqual(diff.describe(), "views : 1 added, 1 removed, 1 changed (1 renamed). datasources : 0 added, 0 removed, 1 changed (1 renamed)")
+
+    def test_each_filter_has_its_own_marker(self):
+        fr, nl = statbel.changes_key(['CSV'], ['fr']), statbel.changes_key(['CSV'], ['nl'])
+        self.assertNotEqual(fr, nl)
+        self.assertEqual(statbel.changes_key(['JSON', 'CSV'], ['nl', 'fr']), statbel.changes_key(['CSV', 'JSON'], ['fr', 'nl']))
+
+        # First --changed-only export of a filter : everything
+        views, diff, _ = statbel.changed_views(self.catalogue(), self.folder, key=fr)
+        self.assertEqual((len(views), diff), (6, None))
+        statbel.mark_changes_exported(self.folder, fr)
+
+        self.views[2]['name'] = "Changed"
+        views, diff, _ = statbel.changed_views(self.catalogue(), self.folder, key=fr)
+        self.assertEqual([view.id for view in views], [2])
+        # nl never ran : everything, even if the catalogue changed since the fr export
+        views, diff, _ = statbel.changed_views(self.catalogue(), self.folder, key=nl)
+        self.assertEqual((len(views), diff), (6, None))
+        statbel.mark_changes_exported(self.folder, nl)
+
+        # fr is still behind, nl is up to date
+        views, _, _ = statbel.changed_views(self.catalogue(), self.folder, key=fr)
+        self.assertEqual([view.id for view in views], [2])
+        views, diff, _ = statbel.changed_views(self.catalogue(), self.folder, key=nl)
+        self.assertEqual((views, bool(diff)), ([], False))
+
+    def test_changes_falls_back_to_the_previous_snapshot(self):
+        statbel.changed_views(self.catalogue(), self.folder)
+        self.views[3]['name'] = "Changed"
+        views, diff, reference = statbel.changed_views(self.catalogue(), self.folder, fallback_previous=True)
+        self.assertEqual([view.id for view in views], [3])
+        self.assertEqual(reference, statbel.list_snapshots(self.folder)[0])
+
+
+if __name__ == '__main__':
+    unittest.main()